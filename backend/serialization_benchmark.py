@@ -0,0 +1,123 @@
+"""Per-1000-budget serialization time of the budget list response.
+
+Compares the previous path (build Budget models, then let FastAPI validate and
+serialize them again against response_model) with json_list_response, which
+validates once and dumps straight to JSON bytes.
+
+Usage: python serialization_benchmark.py [budgets] [items_per_budget] [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from server import Budget, BudgetType, BudgetStatus, json_list_response
+
+
+def make_budget_docs(count: int, items_per_budget: int) -> List[dict]:
+    """Budget documents shaped like the ones Motor returns"""
+    now = datetime.utcnow()
+    budget_types = list(BudgetType)
+    statuses = list(BudgetStatus)
+    docs = []
+    for i in range(count):
+        items = [
+            {
+                "item_id": str(uuid.uuid4()),
+                "item_name": f"Item {j}",
+                "quantity": 2.0,
+                "unit_price": 150.0,
+                "length": 5.0,
+                "height": 3.0,
+                "width": None,
+                "area_m2": 15.0,
+                "canvas_color": "BRANCA",
+                "print_percentage": None,
+                "item_discount_percentage": 0.0,
+                "subtotal": 4500.0,
+                "final_price": 4500.0,
+            }
+            for j in range(items_per_budget)
+        ]
+        docs.append({
+            "id": str(uuid.uuid4()),
+            "client_id": str(uuid.uuid4()),
+            "client_name": f"Cliente {i}",
+            "seller_id": str(uuid.uuid4()),
+            "seller_name": f"Vendedor {i % 10}",
+            "budget_type": budget_types[i % len(budget_types)].value,
+            "items": items,
+            "installation_location": "Rua Exemplo, 123",
+            "travel_distance_km": 12.5,
+            "observations": "Montagem no sábado",
+            "subtotal": 4500.0 * items_per_budget,
+            "discount_percentage": 0.0,
+            "discount_amount": 0.0,
+            "discount_type": "percentage",
+            "total": 4500.0 * items_per_budget,
+            "validity_days": 30,
+            "status": statuses[i % len(statuses)].value,
+            "version": 1,
+            "original_budget_id": None,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+            "created_by": "admin",
+        })
+    return docs
+
+
+async def render_previous(docs: List[dict], field) -> bytes:
+    budgets = [Budget(**doc) for doc in docs]
+    content = await serialize_response(field=field, response_content=budgets)
+    return JSONResponse(content).body
+
+
+def render_current(docs: List[dict]) -> bytes:
+    return json_list_response(Budget, docs, Response()).body
+
+
+def per_thousand_ms(func, docs: List[dict], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(docs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 * 1000 / len(docs)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    items_per_budget = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    docs = make_budget_docs(count, items_per_budget)
+    field = create_response_field(name="budgets", type_=List[Budget])
+    loop = asyncio.new_event_loop()
+
+    def previous(batch):
+        return loop.run_until_complete(render_previous(batch, field))
+
+    # Both paths must produce the same payload
+    assert previous(docs) == render_current(docs)
+
+    before = per_thousand_ms(previous, docs, rounds)
+    after = per_thousand_ms(render_current, docs, rounds)
+    print(f"{count} budgets x {items_per_budget} items, best of {rounds} rounds")
+    print(f"Models + response_model: {before:8.1f} ms per 1000 budgets")
+    print(f"json_list_response:      {after:8.1f} ms per 1000 budgets")
+    print(f"Speedup:                 {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
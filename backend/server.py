@@ -1,19 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne, UpdateMany, ReturnDocument, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, EmailStr, ValidationError, TypeAdapter
+from typing import List, Optional, Dict, Any, Union
 import uuid
+import json
+import base64
+import asyncio
+import time
+import io
+import csv
+import hashlib
+import re
+import unicodedata
+from email.utils import format_datetime, parsedate_to_datetime
+from bisect import bisect_left
+from heapq import nsmallest
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
 import bcrypt
 from enum import Enum
+import numpy as np
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -34,6 +53,26 @@ security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("JWT_SECRET", "favretto-secret-key-2024")
 
+# bcrypt is CPU bound (~250ms per call), so hashing runs in a bounded thread pool
+# instead of on the event loop. Requests beyond the queue limit are rejected.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "200"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+password_hash_stats = {"queued": 0, "running": 0, "completed": 0, "rejected": 0, "max_queued": 0}
+
+# Resolved users keyed by token subject (username), so authenticated requests
+# skip the users lookup. Entries expire after USER_CACHE_TTL_SECONDS.
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.environ.get("USER_CACHE_MAX_SIZE", "1024"))
+user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+user_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+# Renamed clients/sellers are copied into budgets and commissions by a background job
+# that updates NAME_PROPAGATION_BATCH_SIZE documents at a time and pauses between batches.
+NAME_PROPAGATION_BATCH_SIZE = int(os.environ.get("NAME_PROPAGATION_BATCH_SIZE", "500"))
+NAME_PROPAGATION_PAUSE_SECONDS = float(os.environ.get("NAME_PROPAGATION_PAUSE_SECONDS", "0.2"))
+
 # Enums
 class UserRole(str, Enum):
     ADMIN = "admin"
@@ -165,6 +204,11 @@ class PriceTableItemUpdate(BaseModel):
     unit_price: Optional[float] = None
     category: Optional[str] = None
 
+class PriceTableBulkUpsert(BaseModel):
+    items: List[PriceTableItemCreate]
+    update_existing: bool = True  # False only adds codes that do not exist yet
+    deactivate_missing: bool = False  # Soft delete active items whose code is not in the sheet
+
 class CanvasColor(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -231,6 +275,26 @@ class BudgetCreate(BaseModel):
     discount_percentage: float = 0.0
     discount_type: str = "percentage"  # "percentage" or "fixed"
 
+class BudgetQuoteItem(BudgetItem):
+    subtotal: float = 0.0  # Computed by the server
+
+class BudgetQuoteRequest(BaseModel):
+    budget_type: BudgetType
+    items: List[BudgetQuoteItem]
+    discount_percentage: float = 0.0
+    discount_type: str = "percentage"  # "percentage" or "fixed"
+
+class BudgetQuote(BaseModel):
+    budget_type: BudgetType
+    items: List[BudgetItem]
+    subtotal: float
+    discount_amount: float
+    total: float
+
+class BudgetImportRow(BudgetCreate):
+    status: BudgetStatus = BudgetStatus.DRAFT
+    created_at: Optional[datetime] = None
+
 class BudgetUpdate(BaseModel):
     client_id: Optional[str] = None
     seller_id: Optional[str] = None
@@ -242,6 +306,7 @@ class BudgetUpdate(BaseModel):
     discount_percentage: Optional[float] = None
     discount_type: Optional[str] = None  # "percentage" or "fixed"
     status: Optional[BudgetStatus] = None
+    version: Optional[int] = None  # Version being edited; If-Match takes precedence
 
 class Commission(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -277,13 +342,92 @@ class BudgetHistory(BaseModel):
     change_reason: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class BudgetSummary(BaseModel):
+    id: str
+    client_id: str
+    client_name: str
+    seller_id: Optional[str] = None
+    seller_name: Optional[str] = None
+    budget_type: BudgetType
+    status: BudgetStatus
+    total: float
+    version: int = 1
+    created_at: datetime
+
+class BudgetSearchResult(BudgetSummary):
+    score: float
+
+class DashboardStats(BaseModel):
+    total_clients: int
+    total_budgets: int
+    recent_budgets: List[BudgetSummary]
+    monthly_revenue: float
+    month: str
+
+class NamePropagationJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: str  # "client" or "seller"
+    entity_id: str
+    name: str
+    status: str = "pending"  # pending, running, done, failed
+    total: int = 0
+    processed: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class BudgetCreatorBootstrap(BaseModel):
+    # A section is None when the client already holds its current ETag
+    etags: Dict[str, str]
+    clients: Optional[List[Client]] = None
+    sellers: Optional[List[Seller]] = None
+    price_table: Optional[List[PriceTableItem]] = None
+    canvas_colors: Optional[List[CanvasColor]] = None
+    budget_types: Optional[List[Dict[str, str]]] = None
+
 # Helper functions
+def normalize_text(value: Optional[str]) -> str:
+    """Accent-, case- and whitespace-folded form used for name keys and search tokens"""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", stripped.casefold()).strip()
+
+@contextmanager
+def duplicate_key_as_400(detail: str):
+    """Report a unique index violation raised by the write inside the block as a 400"""
+    try:
+        yield
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=detail)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def run_password_hash(func, *args):
+    """Run a bcrypt call in the password pool, keeping queue depth metrics"""
+    if password_hash_stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+        password_hash_stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+
+    password_hash_stats["queued"] += 1
+    password_hash_stats["max_queued"] = max(password_hash_stats["max_queued"], password_hash_stats["queued"])
+    try:
+        await password_hash_slots.acquire()
+    finally:
+        password_hash_stats["queued"] -= 1
+
+    password_hash_stats["running"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        password_hash_stats["running"] -= 1
+        password_hash_stats["completed"] += 1
+        password_hash_slots.release()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -294,6 +438,189 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key values of the last row of a page as an opaque cursor"""
+    payload = [{"$date": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return [
+            datetime.fromisoformat(v["$date"]) if isinstance(v, dict) and "$date" in v else v
+            for v in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Sortable fields per list endpoint, default first. Each one is backed by an index
+# ending in "id" so the (sort field, id) keyset is index-ordered.
+CLIENT_SORT_FIELDS = ["name", "created_at"]
+SELLER_SORT_FIELDS = ["name", "created_at"]
+CANVAS_COLOR_SORT_FIELDS = ["name"]
+PRICE_TABLE_SORT_FIELDS = ["code", "name", "category"]
+BUDGET_SORT_FIELDS = ["created_at", "total"]
+COMMISSION_SORT_FIELDS = ["created_at", "commission_amount"]
+BUDGET_HISTORY_SORT_FIELDS = ["created_at"]
+
+class PageParams(BaseModel):
+    cursor: Optional[str] = None
+    limit: int = DEFAULT_PAGE_SIZE
+    sort: Optional[str] = None
+    order: Optional[str] = None
+    include_total: bool = False
+
+def page_params(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: Optional[str] = None,
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    include_total: bool = False
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit, sort=sort, order=order, include_total=include_total)
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    page: PageParams,
+    response: Response,
+    sort_fields: List[str],
+    default_order: str = "asc",
+    projection: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """Fetch one page of a collection with keyset pagination on (sort field, id).
+
+    The first entry of sort_fields is the default sort. The cursor for the next page is
+    returned in the X-Next-Cursor header and the optional total in X-Total-Count.
+    An inclusive projection always keeps the sort field and id the cursor is built from;
+    _id is always excluded.
+    """
+    sort = page.sort or sort_fields[0]
+    if sort not in sort_fields:
+        raise HTTPException(status_code=400, detail=f"Invalid sort field. Allowed: {', '.join(sort_fields)}")
+    order = page.order or default_order
+    direction = DESCENDING if order == "desc" else ASCENDING
+    # _id is never part of a response, so drop it in Mongo rather than in Python
+    projection = {**projection, sort: 1, "id": 1, "_id": 0} if projection is not None else {"_id": 0}
+
+    if page.include_total:
+        response.headers["X-Total-Count"] = str(await collection.count_documents(query))
+
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        if len(values) != 4 or values[:2] != [sort, order]:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last_value, last_id = values[2:]
+        op = "$lt" if direction == DESCENDING else "$gt"
+        after_cursor = {"$or": [
+            {sort: {op: last_value}},
+            {sort: last_value, "id": {op: last_id}}
+        ]}
+        query = {"$and": [query, after_cursor]} if query else after_cursor
+
+    docs = await collection.find(query, projection).sort([(sort, direction), ("id", direction)]).limit(page.limit + 1).to_list(page.limit + 1)
+
+    # One extra row tells us whether there is a next page
+    if len(docs) > page.limit:
+        docs = docs[:page.limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([sort, order, docs[-1][sort], docs[-1]["id"]])
+
+    return docs
+
+# Conditional GET
+# Catalog collections carry a change version in collection_versions, bumped on every
+# write, so list routes can answer 304 without reading the collection itself.
+async def bump_collection_version(collection_name: str):
+    await db.collection_versions.update_one(
+        {"_id": collection_name},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc).replace(microsecond=0)}},
+        upsert=True
+    )
+    if collection_name == "price_table":
+        price_catalog["version"] = None
+        schedule_price_catalog_refresh()
+
+async def get_collection_version(collection_name: str) -> Dict[str, Any]:
+    version = await db.collection_versions.find_one({"_id": collection_name})
+    return version or {"version": 0, "updated_at": None}
+
+def make_etag(tag: str, request: Request) -> str:
+    # Cursor, limit and sort select a different page, so the query string is part of the tag
+    query_hash = hashlib.sha1(request.url.query.encode()).hexdigest()[:12]
+    return f'W/"{tag}-{query_hash}"'
+
+def not_modified_response(request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Set the validators on the response and return a 304 if the client copy is still fresh"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    fresh = False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            fresh = last_modified <= parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
+
+async def check_not_modified(request: Request, response: Response, collection_name: str) -> Optional[Response]:
+    version = await get_collection_version(collection_name)
+    etag = make_etag(f"{collection_name}-{version['version']}", request)
+    return not_modified_response(request, response, etag, version["updated_at"])
+
+# Fast JSON responses
+class RawJSONResponse(Response):
+    """JSON response whose body is already serialized to bytes"""
+    media_type = "application/json"
+
+list_adapters: Dict[Any, TypeAdapter] = {}
+
+def json_list_response(model, docs: List[Dict[str, Any]], response: Response) -> RawJSONResponse:
+    """Validate Mongo documents once and dump them straight to JSON bytes.
+
+    Returning a Response skips FastAPI's second validation and serialization pass
+    against response_model, which stays on the route for the OpenAPI schema.
+    """
+    adapter = list_adapters.get(model)
+    if adapter is None:
+        adapter = list_adapters[model] = TypeAdapter(List[model])
+    # Carry over the pagination headers set on the injected response
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return RawJSONResponse(adapter.dump_json(adapter.validate_python(docs)), headers=headers)
+
+def get_cached_user(username: str) -> Optional[User]:
+    entry = user_cache.get(username)
+    if entry is None or entry[0] < time.monotonic():
+        user_cache_stats["misses"] += 1
+        return None
+    user_cache.move_to_end(username)
+    user_cache_stats["hits"] += 1
+    return entry[1]
+
+def cache_user(user: User):
+    user_cache[user.username] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+    user_cache.move_to_end(user.username)
+    while len(user_cache) > USER_CACHE_MAX_SIZE:
+        user_cache.popitem(last=False)
+        user_cache_stats["evictions"] += 1
+
+def invalidate_cached_user(username: str):
+    """Drop a cached user; call after deactivating a user or changing their role"""
+    if user_cache.pop(username, None) is not None:
+        user_cache_stats["invalidations"] += 1
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
@@ -303,10 +630,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    cached_user = get_cached_user(username)
+    if cached_user is not None:
+        return cached_user
+    
     user = await db.users.find_one({"username": username})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+    
+    user_obj = User(**user)
+    cache_user(user_obj)
+    return user_obj
 
 # Auth routes
 @api_router.post("/auth/register")
@@ -317,7 +651,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Username or email already registered")
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await run_password_hash(get_password_hash, user_data.password)
     user_dict = user_data.dict(exclude={"password"})
     user_obj = User(**user_dict)
     
@@ -327,7 +661,7 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login")
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"username": user_data.username})
-    if not user or not verify_password(user_data.password, user["password"]):
+    if not user or not await run_password_hash(verify_password, user_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if not user.get("active", True):
@@ -340,27 +674,288 @@ async def login(user_data: UserLogin):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view metrics")
+
+    return {
+        "password_hashing": {
+            **password_hash_stats,
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE
+        },
+        "user_cache": {
+            **user_cache_stats,
+            "size": len(user_cache),
+            "max_size": USER_CACHE_MAX_SIZE,
+            "ttl_seconds": USER_CACHE_TTL_SECONDS
+        }
+    }
+
+# Name propagation
+# Where each kind of entity keeps the name and which (collection, id field, name field)
+# pairs hold a denormalized copy of it
+NAME_PROPAGATION_SOURCES = {"client": "clients", "seller": "sellers"}
+NAME_PROPAGATION_TARGETS = {
+    "client": [("budgets", "client_id", "client_name")],
+    "seller": [("budgets", "seller_id", "seller_name"), ("commissions", "seller_id", "seller_name")],
+}
+
+# Jobs run one at a time, in the order they were queued
+name_propagation_lock = asyncio.Lock()
+# The event loop only keeps weak references to tasks; hold running jobs until they finish
+name_propagation_tasks: set = set()
+
+def start_name_propagation(job_id: str):
+    task = asyncio.create_task(run_name_propagation(job_id))
+    name_propagation_tasks.add(task)
+    task.add_done_callback(name_propagation_tasks.discard)
+
+async def schedule_name_propagation(kind: str, entity_id: str, name: str) -> Optional[NamePropagationJob]:
+    """Queue a background job if any denormalized copy of the name is stale"""
+    targets = NAME_PROPAGATION_TARGETS[kind]
+    stale = await asyncio.gather(*[
+        db[collection].find_one({id_field: entity_id, name_field: {"$ne": name}}, {"_id": 1})
+        for collection, id_field, name_field in targets
+    ])
+    if not any(stale):
+        return None
+    
+    job = NamePropagationJob(kind=kind, entity_id=entity_id, name=name)
+    await db.name_propagation_jobs.insert_one(job.dict())
+    start_name_propagation(job.id)
+    return job
+
+async def run_name_propagation(job_id: str):
+    async with name_propagation_lock:
+        job = await db.name_propagation_jobs.find_one({"id": job_id})
+        if not job or job["status"] in ("done", "failed"):
+            return
+        
+        # The entity may have been renamed again since this job was queued
+        entity = await db[NAME_PROPAGATION_SOURCES[job["kind"]]].find_one({"id": job["entity_id"]}, {"_id": 0, "name": 1})
+        name = entity["name"] if entity else job["name"]
+        targets = NAME_PROPAGATION_TARGETS[job["kind"]]
+        
+        try:
+            counts = await asyncio.gather(*[
+                db[collection].count_documents({id_field: job["entity_id"], name_field: {"$ne": name}})
+                for collection, id_field, name_field in targets
+            ])
+            await db.name_propagation_jobs.update_one({"id": job_id}, {"$set": {
+                "status": "running", "name": name, "total": sum(counts), "processed": 0,
+                "started_at": datetime.now(timezone.utc)
+            }})
+            
+            processed = 0
+            for collection, id_field, name_field in targets:
+                while True:
+                    batch = await db[collection].find(
+                        {id_field: job["entity_id"], name_field: {"$ne": name}}, {"_id": 0, "id": 1}
+                    ).limit(NAME_PROPAGATION_BATCH_SIZE).to_list(NAME_PROPAGATION_BATCH_SIZE)
+                    if not batch:
+                        break
+                    result = await db[collection].update_many(
+                        {"id": {"$in": [doc["id"] for doc in batch]}}, {"$set": {name_field: name}}
+                    )
+                    processed += result.modified_count
+                    await db.name_propagation_jobs.update_one({"id": job_id}, {"$set": {"processed": processed}})
+                    if result.modified_count == 0:
+                        break
+                    # Leave room for interactive traffic between batches
+                    await asyncio.sleep(NAME_PROPAGATION_PAUSE_SECONDS)
+            
+            await db.name_propagation_jobs.update_one({"id": job_id}, {"$set": {
+                "status": "done", "finished_at": datetime.now(timezone.utc)
+            }})
+        except Exception as e:
+            logger.exception(f"Name propagation job {job_id} failed")
+            await db.name_propagation_jobs.update_one({"id": job_id}, {"$set": {
+                "status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc)
+            }})
+
+async def resume_name_propagation_jobs():
+    """Restart jobs interrupted by a shutdown"""
+    jobs = await db.name_propagation_jobs.find(
+        {"status": {"$in": ["pending", "running"]}}, {"_id": 0, "id": 1}
+    ).sort("created_at", ASCENDING).to_list(None)
+    for job in jobs:
+        start_name_propagation(job["id"])
+
+@api_router.get("/admin/name-propagation", response_model=List[NamePropagationJob])
+async def get_name_propagation_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view name propagation jobs")
+    
+    query = {"status": status} if status else {}
+    jobs = await db.name_propagation_jobs.find(query, {"_id": 0}).sort("created_at", DESCENDING).limit(limit).to_list(limit)
+    return [NamePropagationJob(**job) for job in jobs]
+
+@api_router.get("/admin/name-propagation/{job_id}", response_model=NamePropagationJob)
+async def get_name_propagation_job(job_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view name propagation jobs")
+    
+    job = await db.name_propagation_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return NamePropagationJob(**job)
+
+# Normalized name keys
+# clients and sellers carry name_key = normalize_text(name); its unique index makes
+# duplicate checks and lookups accent- and case-insensitive point queries. The index
+# only covers documents that have the key, so startup backfills it before serving.
+NAME_KEY_BACKFILL_BATCH_SIZE = 500
+
+async def backfill_derived_field(collection, field: str, source_fields: List[str], derive) -> Dict[str, Any]:
+    """Set field = derive(doc) on every document that does not have it yet, in batches"""
+    updated = 0
+    conflicts = []
+    
+    async def flush(operations, ids):
+        nonlocal updated
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+        except BulkWriteError as e:
+            updated += e.details["nModified"]
+            # Same folded name as a document that already has its key
+            conflicts.extend(ids[error["index"]] for error in e.details["writeErrors"])
+    
+    cursor = collection.find(
+        {field: {"$exists": False}}, {"_id": 0, "id": 1, **{source: 1 for source in source_fields}}
+    ).batch_size(NAME_KEY_BACKFILL_BATCH_SIZE)
+    operations, ids = [], []
+    async for doc in cursor:
+        operations.append(UpdateOne({"id": doc["id"]}, {"$set": {field: derive(doc)}}))
+        ids.append(doc["id"])
+        if len(operations) == NAME_KEY_BACKFILL_BATCH_SIZE:
+            await flush(operations, ids)
+            operations, ids = [], []
+    if operations:
+        await flush(operations, ids)
+    
+    return {"updated": updated, "conflicts": conflicts}
+
+async def backfill_name_keys() -> Dict[str, Any]:
+    clients, sellers = await asyncio.gather(
+        backfill_derived_field(db.clients, "name_key", ["name"], lambda doc: normalize_text(doc["name"])),
+        backfill_derived_field(db.sellers, "name_key", ["name"], lambda doc: normalize_text(doc["name"]))
+    )
+    return {"clients": clients, "sellers": sellers}
+
+@api_router.post("/admin/name-keys/backfill")
+async def backfill_all_name_keys(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can backfill name keys")
+    
+    return await backfill_name_keys()
+
+# Client search
+# Clients carry search_tokens: the folded words of the searchable fields, plus the bare
+# digits of phone and zip code. Each query word must prefix-match one token, which the
+# multikey search_tokens index answers as a range scan per word. Startup backfills the
+# tokens of clients created before they existed.
+CLIENT_SEARCH_FIELDS = ["name", "contact_name", "phone", "city", "zip_code"]
+CLIENT_SEARCH_CANDIDATES = 200
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    return re.findall(r"[^\W_]+", normalize_text(text))
+
+def client_search_tokens(client: Dict[str, Any]) -> List[str]:
+    tokens = set()
+    for field in CLIENT_SEARCH_FIELDS:
+        tokens.update(search_tokens(client.get(field)))
+    for field in ("phone", "zip_code"):
+        digits = re.sub(r"\D", "", client.get(field) or "")
+        if digits:
+            tokens.add(digits)
+    return sorted(tokens)
+
+@api_router.post("/admin/clients/search-tokens/backfill")
+async def backfill_client_search_tokens(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can backfill search tokens")
+    
+    return await backfill_derived_field(db.clients, "search_tokens", CLIENT_SEARCH_FIELDS, client_search_tokens)
+
 # Client routes
 @api_router.post("/clients", response_model=Client)
 async def create_client(client_data: ClientCreate, current_user: User = Depends(get_current_user)):
-    # Check for duplicate by name and phone
-    existing_client = await db.clients.find_one({
-        "$or": [
-            {"name": client_data.name},
-            {"phone": client_data.phone}
-        ]
-    })
-    if existing_client:
-        raise HTTPException(status_code=400, detail="Cliente já existe com este nome ou telefone")
-    
+    # Duplicate names (compared by name_key) and phones are rejected by unique indexes
     client_obj = Client(**client_data.dict())
-    await db.clients.insert_one(client_obj.dict())
+    with duplicate_key_as_400("Cliente já existe com este nome ou telefone"):
+        await db.clients.insert_one({
+            **client_obj.dict(),
+            "name_key": normalize_text(client_obj.name),
+            "search_tokens": client_search_tokens(client_obj.dict())
+        })
+    await bump_collection_version("clients")
     return client_obj
 
 @api_router.get("/clients", response_model=List[Client])
-async def get_clients(current_user: User = Depends(get_current_user)):
-    clients = await db.clients.find().to_list(1000)
-    return [Client(**client) for client in clients]
+async def get_clients(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params)
+):
+    not_modified = await check_not_modified(request, response, "clients")
+    if not_modified:
+        return not_modified
+    
+    clients = await paginate(db.clients, {}, page, response, CLIENT_SORT_FIELDS)
+    return json_list_response(Client, clients, response)
+
+@api_router.get("/clients/search", response_model=List[Client])
+async def search_clients(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user)
+):
+    words = search_tokens(q)
+    if not words:
+        return []
+    
+    projection = {"_id": 0, "search_tokens": 0}
+    
+    # Names starting with the query come first: a range scan on name_key_unique,
+    # already in name order
+    folded = normalize_text(q)
+    prefix_matches = await db.clients.find(
+        {"name_key": {"$exists": True, "$regex": f"^{re.escape(folded)}"}}, projection
+    ).sort("name_key", ASCENDING).limit(limit).to_list(limit)
+    if len(prefix_matches) == limit:
+        return [Client(**client) for client in prefix_matches]
+    
+    # Fill up with clients where every word prefix-matches a token, ranking a bounded
+    # set of them: names with a word starting with the query before matches on other
+    # fields. Sorting in Mongo would have to fetch every token match first.
+    query = {"$and": [{"search_tokens": {"$regex": f"^{re.escape(word)}"}} for word in words]}
+    query["id"] = {"$nin": [client["id"] for client in prefix_matches]}
+    candidates = await db.clients.find(query, projection).limit(CLIENT_SEARCH_CANDIDATES).to_list(CLIENT_SEARCH_CANDIDATES)
+    
+    def rank(client):
+        name_key = normalize_text(client["name"])
+        if any(token.startswith(words[0]) for token in search_tokens(client["name"])):
+            return (0, name_key)
+        return (1, name_key)
+    
+    candidates.sort(key=rank)
+    return [Client(**client) for client in prefix_matches + candidates[:limit - len(prefix_matches)]]
+
+@api_router.get("/clients/lookup", response_model=Client)
+async def lookup_client(name: str = Query(..., min_length=1), current_user: User = Depends(get_current_user)):
+    # Accent- and case-insensitive exact match, a point query on name_key_unique
+    client = await db.clients.find_one({"name_key": normalize_text(name)}, {"_id": 0})
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return Client(**client)
 
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str, current_user: User = Depends(get_current_user)):
@@ -374,26 +969,23 @@ async def update_client(client_id: str, client_data: ClientUpdate, current_user:
     update_data = {k: v for k, v in client_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    # Check for duplicates if name or phone is being updated
-    if "name" in update_data or "phone" in update_data:
-        query_conditions = []
-        if "name" in update_data:
-            query_conditions.append({"name": update_data["name"]})
-        if "phone" in update_data:
-            query_conditions.append({"phone": update_data["phone"]})
-        
-        existing_client = await db.clients.find_one({
-            "$or": query_conditions,
-            "id": {"$ne": client_id}  # Exclude current client
-        })
-        if existing_client:
-            raise HTTPException(status_code=400, detail="Cliente já existe com este nome ou telefone")
-    
-    result = await db.clients.update_one({"id": client_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    if "name" in update_data:
+        update_data["name_key"] = normalize_text(update_data["name"])
+    # The edit form sends every field, so the tokens can usually be written in the same update
+    if all(field in update_data for field in CLIENT_SEARCH_FIELDS):
+        update_data["search_tokens"] = client_search_tokens(update_data)
+    
+    with duplicate_key_as_400("Cliente já existe com este nome ou telefone"):
+        updated_client = await db.clients.find_one_and_update(
+            {"id": client_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    if not updated_client:
         raise HTTPException(status_code=404, detail="Client not found")
-    
-    updated_client = await db.clients.find_one({"id": client_id})
+    if "search_tokens" not in update_data and any(field in update_data for field in CLIENT_SEARCH_FIELDS):
+        await db.clients.update_one({"id": client_id}, {"$set": {"search_tokens": client_search_tokens(updated_client)}})
+    await bump_collection_version("clients")
+    if "name" in update_data:
+        await schedule_name_propagation("client", client_id, updated_client["name"])
     return Client(**updated_client)
 
 @api_router.delete("/clients/{client_id}")
@@ -401,29 +993,39 @@ async def delete_client(client_id: str, current_user: User = Depends(get_current
     result = await db.clients.delete_one({"id": client_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
+    await bump_collection_version("clients")
     return {"message": "Client deleted successfully"}
 
 # Seller routes
 @api_router.post("/sellers", response_model=Seller)
 async def create_seller(seller_data: SellerCreate, current_user: User = Depends(get_current_user)):
-    # Check for duplicate by name or registration number
-    existing_seller = await db.sellers.find_one({
-        "$or": [
-            {"name": seller_data.name},
-            {"registration_number": seller_data.registration_number} if seller_data.registration_number else {"name": seller_data.name}
-        ]
-    })
-    if existing_seller:
-        raise HTTPException(status_code=400, detail="Vendedor já existe com este nome ou registro")
-    
+    # Duplicate names (compared by name_key) and registration numbers are rejected by unique indexes
     seller_obj = Seller(**seller_data.dict())
-    await db.sellers.insert_one(seller_obj.dict())
+    with duplicate_key_as_400("Vendedor já existe com este nome ou registro"):
+        await db.sellers.insert_one({**seller_obj.dict(), "name_key": normalize_text(seller_obj.name)})
+    await bump_collection_version("sellers")
     return seller_obj
 
 @api_router.get("/sellers", response_model=List[Seller])
-async def get_sellers(current_user: User = Depends(get_current_user)):
-    sellers = await db.sellers.find({"active": True}).to_list(1000)
-    return [Seller(**seller) for seller in sellers]
+async def get_sellers(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params)
+):
+    not_modified = await check_not_modified(request, response, "sellers")
+    if not_modified:
+        return not_modified
+    
+    sellers = await paginate(db.sellers, {"active": True}, page, response, SELLER_SORT_FIELDS)
+    return json_list_response(Seller, sellers, response)
+
+@api_router.get("/sellers/lookup", response_model=Seller)
+async def lookup_seller(name: str = Query(..., min_length=1), current_user: User = Depends(get_current_user)):
+    seller = await db.sellers.find_one({"name_key": normalize_text(name)}, {"_id": 0})
+    if not seller:
+        raise HTTPException(status_code=404, detail="Seller not found")
+    return Seller(**seller)
 
 @api_router.get("/sellers/{seller_id}", response_model=Seller)
 async def get_seller(seller_id: str, current_user: User = Depends(get_current_user)):
@@ -437,27 +1039,18 @@ async def update_seller(seller_id: str, seller_data: SellerUpdate, current_user:
     update_data = {k: v for k, v in seller_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    # Check for duplicates if name or registration number is being updated
-    if "name" in update_data or "registration_number" in update_data:
-        query_conditions = []
-        if "name" in update_data:
-            query_conditions.append({"name": update_data["name"]})
-        if "registration_number" in update_data and update_data["registration_number"]:
-            query_conditions.append({"registration_number": update_data["registration_number"]})
-        
-        if query_conditions:
-            existing_seller = await db.sellers.find_one({
-                "$or": query_conditions,
-                "id": {"$ne": seller_id}  # Exclude current seller
-            })
-            if existing_seller:
-                raise HTTPException(status_code=400, detail="Vendedor já existe com este nome ou registro")
-    
-    result = await db.sellers.update_one({"id": seller_id}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Seller not found")
+    if "name" in update_data:
+        update_data["name_key"] = normalize_text(update_data["name"])
     
-    updated_seller = await db.sellers.find_one({"id": seller_id})
+    with duplicate_key_as_400("Vendedor já existe com este nome ou registro"):
+        updated_seller = await db.sellers.find_one_and_update(
+            {"id": seller_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    if not updated_seller:
+        raise HTTPException(status_code=404, detail="Seller not found")
+    await bump_collection_version("sellers")
+    if "name" in update_data:
+        await schedule_name_propagation("seller", seller_id, updated_seller["name"])
     return Seller(**updated_seller)
 
 @api_router.delete("/sellers/{seller_id}")
@@ -469,48 +1062,50 @@ async def delete_seller(seller_id: str, current_user: User = Depends(get_current
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Seller not found")
+    await bump_collection_version("sellers")
     return {"message": "Seller deleted successfully"}
 
 # Canvas Color routes
 @api_router.post("/canvas-colors", response_model=CanvasColor)
 async def create_canvas_color(color_data: CanvasColorCreate, current_user: User = Depends(get_current_user)):
-    # Check for duplicate name
-    existing_color = await db.canvas_colors.find_one({"name": color_data.name.upper(), "active": True})
-    if existing_color:
-        raise HTTPException(status_code=400, detail="Cor já existe")
-    
     color_dict = color_data.dict()
     color_dict["name"] = color_dict["name"].upper()  # Store colors in uppercase
     color_obj = CanvasColor(**color_dict)
-    await db.canvas_colors.insert_one(color_obj.dict())
+    # Active colors are unique by name (name_active_unique)
+    with duplicate_key_as_400("Cor já existe"):
+        await db.canvas_colors.insert_one(color_obj.dict())
+    await bump_collection_version("canvas_colors")
     return color_obj
 
 @api_router.get("/canvas-colors", response_model=List[CanvasColor])
-async def get_canvas_colors(current_user: User = Depends(get_current_user)):
-    colors = await db.canvas_colors.find({"active": True}).to_list(1000)
-    return [CanvasColor(**color) for color in colors]
+async def get_canvas_colors(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params)
+):
+    not_modified = await check_not_modified(request, response, "canvas_colors")
+    if not_modified:
+        return not_modified
+    
+    colors = await paginate(db.canvas_colors, {"active": True}, page, response, CANVAS_COLOR_SORT_FIELDS)
+    return json_list_response(CanvasColor, colors, response)
 
 @api_router.put("/canvas-colors/{color_id}", response_model=CanvasColor)
 async def update_canvas_color(color_id: str, color_data: CanvasColorUpdate, current_user: User = Depends(get_current_user)):
     update_data = {k: v for k, v in color_data.dict().items() if v is not None}
     if "name" in update_data:
         update_data["name"] = update_data["name"].upper()
-        # Check for duplicate name
-        existing_color = await db.canvas_colors.find_one({
-            "name": update_data["name"],
-            "active": True,
-            "id": {"$ne": color_id}
-        })
-        if existing_color:
-            raise HTTPException(status_code=400, detail="Cor já existe")
     
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.canvas_colors.update_one({"id": color_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    with duplicate_key_as_400("Cor já existe"):
+        updated_color = await db.canvas_colors.find_one_and_update(
+            {"id": color_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    if not updated_color:
         raise HTTPException(status_code=404, detail="Color not found")
-    
-    updated_color = await db.canvas_colors.find_one({"id": color_id})
+    await bump_collection_version("canvas_colors")
     return CanvasColor(**updated_color)
 
 @api_router.delete("/canvas-colors/{color_id}")
@@ -522,6 +1117,7 @@ async def delete_canvas_color(color_id: str, current_user: User = Depends(get_cu
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Color not found")
+    await bump_collection_version("canvas_colors")
     return {"message": "Color deleted successfully"}
 
 # Initialize default canvas colors
@@ -547,6 +1143,8 @@ async def initialize_default_colors(current_user: User = Depends(get_current_use
             await db.canvas_colors.insert_one(color_obj.dict())
             created_count += 1
     
+    if created_count:
+        await bump_collection_version("canvas_colors")
     return {"message": f"Initialized {created_count} default colors"}
 
 # Price table routes
@@ -555,25 +1153,104 @@ async def create_price_item(item_data: PriceTableItemCreate, current_user: User
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only admins can modify price table")
     
-    # Check if code already exists
-    existing_item = await db.price_table.find_one({"code": item_data.code, "active": True})
-    if existing_item:
-        raise HTTPException(status_code=400, detail="Item with this code already exists")
-    
+    # Active codes are unique (code_active_unique)
     item_obj = PriceTableItem(**item_data.dict())
-    await db.price_table.insert_one(item_obj.dict())
+    with duplicate_key_as_400("Item with this code already exists"):
+        await db.price_table.insert_one(item_obj.dict())
+    await bump_collection_version("price_table")
     return item_obj
 
 @api_router.get("/price-table", response_model=List[PriceTableItem])
-async def get_price_table(current_user: User = Depends(get_current_user)):
-    items = await db.price_table.find({"active": True}).to_list(1000)
-    return [PriceTableItem(**item) for item in items]
+async def get_price_table(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params)
+):
+    not_modified = await check_not_modified(request, response, "price_table")
+    if not_modified:
+        return not_modified
+    
+    items = await paginate(db.price_table, {"active": True}, page, response, PRICE_TABLE_SORT_FIELDS)
+    return json_list_response(PriceTableItem, items, response)
+
+@api_router.post("/price-table/bulk")
+async def bulk_upsert_price_items(bulk_data: PriceTableBulkUpsert, current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can modify price table")
+    
+    codes = [item.code for item in bulk_data.items]
+    duplicated = sorted(code for code, count in Counter(codes).items() if count > 1)
+    if duplicated:
+        raise HTTPException(status_code=400, detail=f"Duplicate codes in sheet: {', '.join(duplicated)}")
+    
+    # One read to classify rows, then a single bulk_write keyed by active code
+    existing_items = await db.price_table.find(
+        {"code": {"$in": codes}, "active": True},
+        {"_id": 0, "code": 1, "name": 1, "unit": 1, "unit_price": 1, "category": 1}
+    ).to_list(None)
+    existing_by_code = {item["code"]: item for item in existing_items}
+    
+    now = datetime.now(timezone.utc)
+    operations = []
+    created = updated = unchanged = 0
+    for item in bulk_data.items:
+        fields = item.dict()
+        existing = existing_by_code.get(item.code)
+        if existing is None:
+            new_item = PriceTableItem(**fields, created_at=now, updated_at=now).dict()
+            operations.append(UpdateOne(
+                {"code": item.code, "active": True},
+                {"$setOnInsert": new_item},
+                upsert=True
+            ))
+            created += 1
+        elif not bulk_data.update_existing or all(existing.get(k) == v for k, v in fields.items()):
+            unchanged += 1
+        else:
+            operations.append(UpdateOne(
+                {"code": item.code, "active": True},
+                {"$set": {**fields, "updated_at": now}}
+            ))
+            updated += 1
+    
+    if bulk_data.deactivate_missing:
+        operations.append(UpdateMany(
+            {"code": {"$nin": codes}, "active": True},
+            {"$set": {"active": False, "updated_at": now}}
+        ))
+    
+    deactivated = 0
+    if operations:
+        result = await db.price_table.bulk_write(operations, ordered=False)
+        await bump_collection_version("price_table")
+        if bulk_data.deactivate_missing:
+            deactivated = max(result.modified_count - updated, 0)
+    
+    return {"created": created, "updated": updated, "unchanged": unchanged, "deactivated": deactivated}
 
 @api_router.get("/price-table/categories")
-async def get_price_categories(current_user: User = Depends(get_current_user)):
+async def get_price_categories(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    not_modified = await check_not_modified(request, response, "price_table")
+    if not_modified:
+        return not_modified
+    
     categories = await db.price_table.distinct("category", {"active": True})
     return {"categories": categories}
 
+@api_router.get("/price-table/suggest", response_model=List[PriceTableItem])
+async def suggest_price_table(
+    q: str = Query(..., min_length=1),
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user)
+):
+    # Answered from memory only; a stale snapshot keeps serving while it reloads
+    if price_catalog["version"] is None or time.monotonic() - price_catalog["checked_at"] > PRICE_CATALOG_RECHECK_SECONDS:
+        schedule_price_catalog_refresh()
+    
+    return [PriceTableItem(**item) for item in suggest_price_items(q, category, limit)]
+
 @api_router.put("/price-table/{item_id}", response_model=PriceTableItem)
 async def update_price_item(item_id: str, item_data: PriceTableItemUpdate, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
@@ -582,17 +1259,13 @@ async def update_price_item(item_id: str, item_data: PriceTableItemUpdate, curre
     update_data = {k: v for k, v in item_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    # Check if code already exists (if updating code)
-    if "code" in update_data:
-        existing_item = await db.price_table.find_one({"code": update_data["code"], "active": True, "id": {"$ne": item_id}})
-        if existing_item:
-            raise HTTPException(status_code=400, detail="Item with this code already exists")
-    
-    result = await db.price_table.update_one({"id": item_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    with duplicate_key_as_400("Item with this code already exists"):
+        updated_item = await db.price_table.find_one_and_update(
+            {"id": item_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    if not updated_item:
         raise HTTPException(status_code=404, detail="Price item not found")
-    
-    updated_item = await db.price_table.find_one({"id": item_id})
+    await bump_collection_version("price_table")
     return PriceTableItem(**updated_item)
 
 @api_router.delete("/price-table/{item_id}")
@@ -604,8 +1277,475 @@ async def delete_price_item(item_id: str, current_user: User = Depends(get_curre
     result = await db.price_table.update_one({"id": item_id}, {"$set": {"active": False, "updated_at": datetime.now(timezone.utc)}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Price item not found")
+    await bump_collection_version("price_table")
     return {"message": "Price item deleted successfully"}
 
+# Budget calculations
+# The server prices every item itself; subtotal/final_price sent by the browser are ignored.
+# The rules are the same for every BudgetType:
+#   area_m2     = length * height (* width when given), or the informed area_m2
+#   subtotal    = area_m2 * quantity * unit_price, or quantity * unit_price without area
+#   final_price = subtotal * print_percentage / 100 when printed, less the item discount
+def price_budget_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return copies of the items with area_m2, subtotal and final_price computed"""
+    if not items:
+        return []
+    
+    def column(field: str) -> np.ndarray:
+        return np.array([item.get(field) or 0.0 for item in items], dtype=float)
+    
+    length, height, width = column("length"), column("height"), column("width")
+    quantity, unit_price = column("quantity"), column("unit_price")
+    print_percentage = column("print_percentage")
+    item_discount_percentage = column("item_discount_percentage")
+    
+    # A typed area wins over the dimensions, as in the budget form
+    area = column("area_m2")
+    derive_area = (area <= 0) & (length > 0) & (height > 0)
+    area = np.where(derive_area, length * height * np.where(width > 0, width, 1.0), area)
+    subtotal = np.where(area > 0, area * quantity * unit_price, quantity * unit_price)
+    final_price = np.where(print_percentage > 0, subtotal * (print_percentage / 100), subtotal)
+    final_price = np.where(item_discount_percentage > 0, final_price * (1 - item_discount_percentage / 100), final_price)
+    
+    # Items without a price are worth nothing
+    priced = unit_price > 0
+    subtotal = np.where(priced, subtotal, 0.0)
+    final_price = np.where(priced, final_price, 0.0)
+    
+    return [
+        {
+            **item,
+            "area_m2": float(area[i]) if area[i] > 0 else None,
+            "subtotal": float(subtotal[i]),
+            "final_price": float(final_price[i])
+        }
+        for i, item in enumerate(items)
+    ]
+
+def calculate_budget_totals(items: List[Dict[str, Any]], discount_percentage: float, discount_type: str) -> Dict[str, Any]:
+    """Price the items and compute the budget totals; the result carries the priced items"""
+    items = price_budget_items(items)
+    subtotal = float(sum(item["final_price"] for item in items))
+    
+    # Calculate discount based on type
+    if discount_type == "fixed":
+        discount_amount = discount_percentage  # When type is "fixed", discount_percentage contains the fixed amount
+    else:  # percentage
+        discount_amount = subtotal * (discount_percentage / 100)
+    
+    return {"items": items, "subtotal": subtotal, "discount_amount": discount_amount, "total": subtotal - discount_amount}
+
+# Price catalog
+# Snapshot of the active price table keyed by id, tagged with the price_table change
+# version it was loaded at. Budget writes resolve their items from it while the version
+# still matches, and fall back to a single $in query while it is being reloaded. The item
+# typeahead is served from a prefix index built with the same snapshot: codes and name
+# tokens sit in sorted (key, id) lists, so each prefix is one bisect plus a short scan.
+# The snapshot is loaded at startup and after local writes; the typeahead never waits on
+# Mongo and re-checks the stored version in the background at most every
+# PRICE_CATALOG_RECHECK_SECONDS, to pick up writes made by other workers.
+PRICE_CATALOG_PROJECTION = {"_id": 0, "id": 1, "name": 1, "unit_price": 1}
+PRICE_CATALOG_RECHECK_SECONDS = 30
+
+price_catalog: Dict[str, Any] = {"version": None, "checked_at": 0.0, "items": {}, "suggest": None, "refresh": None}
+
+def build_price_suggest_index(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "keys": {item["id"]: (normalize_text(item["code"]), normalize_text(item["name"])) for item in items},
+        "codes": sorted((normalize_text(item["code"]), item["id"]) for item in items),
+        "tokens": sorted({(token, item["id"]) for item in items for token in search_tokens(item["name"])})
+    }
+
+async def refresh_price_catalog(version: Optional[int] = None):
+    """Reload the snapshot; without a version, only if the stored one moved since the last load"""
+    price_catalog["checked_at"] = time.monotonic()
+    if version is None:
+        version = (await get_collection_version("price_table"))["version"]
+        if version == price_catalog["version"]:
+            return
+    items = await db.price_table.find({"active": True}, {"_id": 0}).to_list(None)
+    price_catalog["items"] = {item["id"]: item for item in items}
+    price_catalog["suggest"] = build_price_suggest_index(items)
+    price_catalog["version"] = version
+
+def log_price_catalog_refresh(task: asyncio.Task):
+    # Nobody awaits background reloads, so report failures here
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Price catalog refresh failed", exc_info=task.exception())
+
+def schedule_price_catalog_refresh(version: Optional[int] = None) -> asyncio.Task:
+    refresh = price_catalog["refresh"]
+    if refresh is None or refresh.done():
+        refresh = price_catalog["refresh"] = asyncio.create_task(refresh_price_catalog(version))
+        refresh.add_done_callback(log_price_catalog_refresh)
+    return refresh
+
+async def get_catalog_entries(item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Active price table entries for the given ids; unknown or inactive ids are left out"""
+    version = (await get_collection_version("price_table"))["version"]
+    if price_catalog["version"] == version:
+        items = price_catalog["items"]
+        return {item_id: items[item_id] for item_id in item_ids if item_id in items}
+    
+    # Cold or stale snapshot: reload it in the background and answer this request directly
+    schedule_price_catalog_refresh(version)
+    entries = await db.price_table.find(
+        {"id": {"$in": list(set(item_ids))}, "active": True}, PRICE_CATALOG_PROJECTION
+    ).to_list(None)
+    return {entry["id"]: entry for entry in entries}
+
+def prefix_matches(entries: List[tuple], prefix: str) -> set:
+    """Ids of the (key, id) entries whose key starts with prefix"""
+    ids = set()
+    position = bisect_left(entries, (prefix,))
+    while position < len(entries) and entries[position][0].startswith(prefix):
+        ids.add(entries[position][1])
+        position += 1
+    return ids
+
+def suggest_price_items(q: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    items, suggest = price_catalog["items"], price_catalog["suggest"]
+    folded = normalize_text(q)
+    if not folded or suggest is None:
+        return []
+    code_ids = prefix_matches(suggest["codes"], folded)
+    
+    # Every query word must prefix-match a word of the name
+    name_ids = None
+    for word in search_tokens(q):
+        word_ids = prefix_matches(suggest["tokens"], word)
+        name_ids = word_ids if name_ids is None else name_ids & word_ids
+    
+    # Exact code first, then code prefixes, then name matches
+    keys = suggest["keys"]
+    def rank(item_id):
+        code, name = keys[item_id]
+        if item_id in code_ids:
+            return (0 if code == folded else 1, code)
+        return (2, name)
+    
+    matches = code_ids | (name_ids or set())
+    if category:
+        matches = [item_id for item_id in matches if items[item_id]["category"] == category]
+    return [items[item_id] for item_id in nsmallest(limit, matches, key=rank)]
+
+def apply_catalog_snapshot(items: List[Dict[str, Any]], catalog: Dict[str, Dict[str, Any]], keep_prices: bool = False) -> List[Dict[str, Any]]:
+    """Copy name and unit price from the catalog into the items, rejecting unknown or inactive items"""
+    missing = sorted({item["item_id"] for item in items} - catalog.keys())
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Price items not found or inactive: {', '.join(missing)}")
+    
+    snapshot = []
+    for item in items:
+        entry = catalog[item["item_id"]]
+        item = {**item, "item_name": entry["name"]}
+        if not keep_prices:
+            item["unit_price"] = entry["unit_price"]
+        snapshot.append(item)
+    return snapshot
+
+async def snapshot_budget_items(items: List[Dict[str, Any]], existing_items: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Resolve the items through the catalog; item_ids the budget already had keep their stored name and price"""
+    stored = {}
+    for item in existing_items or []:
+        stored.setdefault(item["item_id"], item)
+    
+    new_items = [item for item in items if item["item_id"] not in stored]
+    catalog = await get_catalog_entries([item["item_id"] for item in new_items]) if new_items else {}
+    resolved = iter(apply_catalog_snapshot(new_items, catalog))
+    return [
+        {**item, "item_name": stored[item["item_id"]]["item_name"], "unit_price": stored[item["item_id"]]["unit_price"]}
+        if item["item_id"] in stored else next(resolved)
+        for item in items
+    ]
+
+# Budget rollups
+# budget_rollups keeps count/subtotal/total per (month, status, budget_type, seller_id)
+# so revenue figures read one row per month instead of scanning budgets. Incremental
+# updates only hold once the rows were built from budgets, which collection_versions
+# records under "budget_rollups"; startup builds them on databases that never were.
+ROLLUP_KEY_FIELDS = ("month", "status", "budget_type", "seller_id")
+
+def _enum_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+def budget_rollup_key(budget: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "month": budget["created_at"].strftime("%Y-%m"),
+        "status": _enum_value(budget.get("status", BudgetStatus.DRAFT)),
+        "budget_type": _enum_value(budget["budget_type"]),
+        "seller_id": budget.get("seller_id") or None
+    }
+
+async def update_budget_rollups(old_budget: Optional[Dict[str, Any]], new_budget: Optional[Dict[str, Any]]):
+    """Move a budget's contribution from its old rollup row to its new one"""
+    await apply_budget_rollup_changes([(old_budget, -1), (new_budget, 1)])
+
+async def apply_budget_rollup_changes(changes: List[tuple]):
+    """Apply (budget, +1/-1) contributions to the rollups in a single bulk_write"""
+    deltas = {}
+    for budget, sign in changes:
+        if budget is None:
+            continue
+        key = tuple(budget_rollup_key(budget).items())
+        delta = deltas.setdefault(key, {"count": 0, "subtotal": 0.0, "total": 0.0})
+        delta["count"] += sign
+        delta["subtotal"] += sign * budget.get("subtotal", 0)
+        delta["total"] += sign * budget.get("total", 0)
+    
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(dict(key), {"$inc": delta, "$set": {"updated_at": now}}, upsert=True)
+        for key, delta in deltas.items()
+        if any(delta.values())
+    ]
+    if operations:
+        await db.budget_rollups.bulk_write(operations, ordered=False)
+
+def _rollup_seller_id_expression():
+    # Budgets without a seller may store null or an empty string
+    return {"$cond": [{"$in": [{"$ifNull": ["$seller_id", ""]}, [""]]}, None, "$seller_id"]}
+
+async def build_budget_rollups() -> int:
+    """Recompute budget_rollups from the budgets collection and record the build"""
+    pipeline = [
+        {
+            "$group": {
+                "_id": {
+                    "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                    "status": "$status",
+                    "budget_type": "$budget_type",
+                    "seller_id": _rollup_seller_id_expression()
+                },
+                "count": {"$sum": 1},
+                "subtotal": {"$sum": "$subtotal"},
+                "total": {"$sum": "$total"}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "month": "$_id.month",
+                "status": "$_id.status",
+                "budget_type": "$_id.budget_type",
+                "seller_id": "$_id.seller_id",
+                "count": 1,
+                "subtotal": 1,
+                "total": 1,
+                "updated_at": "$$NOW"
+            }
+        },
+        {"$out": "budget_rollups"}
+    ]
+    await db.budgets.aggregate(pipeline).to_list(None)
+    await db.collection_versions.update_one(
+        {"_id": "budget_rollups"},
+        {"$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return await db.budget_rollups.count_documents({})
+
+async def ensure_budget_rollups():
+    marker = await db.collection_versions.find_one({"_id": "budget_rollups"})
+    if marker and marker.get("built_at"):
+        return
+    rows = await build_budget_rollups()
+    logger.info(f"Built {rows} budget rollup rows")
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_budget_rollups(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can rebuild rollups")
+    
+    rows = await build_budget_rollups()
+    return {"message": f"Rebuilt {rows} rollup rows"}
+
+@api_router.get("/reports/monthly")
+async def get_monthly_report(
+    current_user: User = Depends(get_current_user),
+    start_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    status: Optional[str] = None,
+    budget_type: Optional[str] = None,
+    seller_id: Optional[str] = None
+):
+    query = {}
+    
+    if start_month or end_month:
+        month_query = {}
+        if start_month:
+            month_query["$gte"] = start_month
+        if end_month:
+            month_query["$lte"] = end_month
+        query["month"] = month_query
+    
+    if status and status != "all":
+        query["status"] = status
+    
+    if budget_type:
+        query["budget_type"] = budget_type
+    
+    if seller_id:
+        query["seller_id"] = seller_id
+    
+    pipeline = [
+        {"$match": query},
+        {
+            "$group": {
+                "_id": "$month",
+                "count": {"$sum": "$count"},
+                "subtotal": {"$sum": "$subtotal"},
+                "total": {"$sum": "$total"}
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "month": "$_id", "count": 1, "subtotal": 1, "total": 1}}
+    ]
+    months = await db.budget_rollups.aggregate(pipeline).to_list(None)
+    return {"months": months}
+
+# Budget history
+# Entries that start a budget's history ("created", "imported", "duplicated_from") keep
+# the full budget, and so does "deleted": deleting a budget clears its earlier history,
+# so that entry is the only record left. Updates only store a delta against the previous version:
+#   {"fields": {field: new value}, "items": {"length": n, "changed": {index: {field: value}}, "appended": [...]}}
+# and the read path replays the entries to rebuild the full change view.
+HISTORY_COMPACTION_BATCH_SIZE = 500
+
+def diff_budget_items(old_items: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Positional item diff: changed fields per index, then truncation and appended items"""
+    changed = {}
+    for index, (old_item, new_item) in enumerate(zip(old_items, new_items)):
+        item_changes = {k: v for k, v in new_item.items() if old_item.get(k) != v}
+        if item_changes:
+            changed[str(index)] = item_changes
+    appended = new_items[len(old_items):]
+    if not changed and len(old_items) == len(new_items):
+        return None
+    return {"length": len(new_items), "changed": changed, "appended": appended}
+
+def diff_budget(old_budget: Dict[str, Any], new_budget: Dict[str, Any]) -> Dict[str, Any]:
+    delta = {"fields": {
+        k: v for k, v in new_budget.items()
+        if k not in ("_id", "items") and old_budget.get(k) != v
+    }}
+    items = diff_budget_items(old_budget.get("items") or [], new_budget.get("items") or [])
+    if items:
+        delta["items"] = items
+    return delta
+
+def apply_budget_delta(budget: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    budget = {**budget, **delta.get("fields", {})}
+    if "items" in delta:
+        items_delta = delta["items"]
+        items = [dict(item) for item in budget.get("items") or []][:items_delta["length"]]
+        for index, item_changes in items_delta["changed"].items():
+            if int(index) < len(items):
+                items[int(index)].update(item_changes)
+        items.extend(items_delta["appended"])
+        budget["items"] = items
+    return budget
+
+def replay_budget_history(entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Expanded changes per entry id, replaying entries in chronological order"""
+    expanded = {}
+    state: Dict[str, Any] = {}
+    # Budgets duplicated before full snapshots were stored have no base to replay
+    # deltas on; their deltas are returned as stored
+    has_base = False
+    for entry in sorted(entries, key=lambda e: (e["created_at"], e["id"])):
+        changes = entry["changes"]
+        if "delta" in changes and not has_base:
+            expanded[entry["id"]] = changes
+        elif "delta" in changes:
+            new_state = apply_budget_delta(state, changes["delta"])
+            changed_fields = list(changes["delta"].get("fields", {})) + (["items"] if "items" in changes["delta"] else [])
+            expanded[entry["id"]] = {
+                "action": changes["action"],
+                "changes": {field: new_state.get(field) for field in changed_fields},
+                "previous": {field: state.get(field) for field in changed_fields}
+            }
+            state = new_state
+        else:
+            # Full snapshots and entries written before delta encoding
+            if "budget" in changes and changes["action"] != "deleted":
+                state = dict(changes["budget"])
+                has_base = True
+            elif "changes" in changes:
+                state = {**state, **changes["changes"]}
+            expanded[entry["id"]] = changes
+    return expanded
+
+async def expand_budget_history(budget_id: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not any("delta" in entry["changes"] for entry in entries):
+        return entries
+    # Deltas depend on every earlier entry, so replay the budget's whole history
+    full_history = await db.budget_history.find(
+        {"budget_id": budget_id}, {"_id": 0, "id": 1, "changes": 1, "created_at": 1}
+    ).to_list(None)
+    expanded = replay_budget_history(full_history)
+    return [{**entry, "changes": expanded.get(entry["id"], entry["changes"])} for entry in entries]
+
+def compact_history_entries(entries: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Rewrite one budget's full-copy update entries as deltas; deletion entries are left alone"""
+    operations = []
+    state: Dict[str, Any] = {}
+    has_base = False
+    for entry in sorted(entries, key=lambda e: (e["created_at"], e["id"])):
+        changes = entry["changes"]
+        if "delta" in changes:
+            state = apply_budget_delta(state, changes["delta"])
+        elif changes.get("action") == "deleted":
+            continue
+        elif "budget" in changes:
+            state = dict(changes["budget"])
+            has_base = True
+        elif "changes" in changes:
+            new_state = {**state, **changes["changes"]}
+            # Without a base snapshot the full copy is the only record, keep it
+            if has_base:
+                delta = {"action": changes["action"], "delta": diff_budget(state, new_state)}
+                operations.append(UpdateOne({"id": entry["id"]}, {"$set": {"changes": delta}}))
+            state = new_state
+    return operations
+
+@api_router.post("/admin/budget-history/compact")
+async def compact_budget_history(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can compact budget history")
+    
+    # Stream the history grouped by budget (backed by budget_created_at_id read backwards)
+    cursor = db.budget_history.find({}, {"_id": 0}).sort(
+        [("budget_id", DESCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]
+    ).batch_size(HISTORY_COMPACTION_BATCH_SIZE)
+    
+    budgets = compacted = 0
+    operations = []
+    current_id, current_entries = None, []
+    
+    async def flush_operations():
+        nonlocal operations, compacted
+        if operations:
+            result = await db.budget_history.bulk_write(operations, ordered=False)
+            compacted += result.modified_count
+            operations = []
+    
+    async for entry in cursor:
+        if entry["budget_id"] != current_id:
+            if current_entries:
+                operations.extend(compact_history_entries(current_entries))
+                budgets += 1
+            current_id, current_entries = entry["budget_id"], []
+            if len(operations) >= HISTORY_COMPACTION_BATCH_SIZE:
+                await flush_operations()
+        current_entries.append(entry)
+    if current_entries:
+        operations.extend(compact_history_entries(current_entries))
+        budgets += 1
+    await flush_operations()
+    
+    return {"budgets": budgets, "compacted": compacted}
+
 # Budget routes
 @api_router.post("/budgets", response_model=Budget)
 async def create_budget(budget_data: BudgetCreate, current_user: User = Depends(get_current_user)):
@@ -622,29 +1762,20 @@ async def create_budget(budget_data: BudgetCreate, current_user: User = Depends(
             raise HTTPException(status_code=404, detail="Seller not found")
         seller_name = seller["name"]
     
-    # Calculate totals
-    subtotal = sum(item.final_price or item.subtotal for item in budget_data.items)
-    
-    # Calculate discount based on type
-    if budget_data.discount_type == "fixed":
-        discount_amount = budget_data.discount_percentage  # When type is "fixed", discount_percentage contains the fixed amount
-    else:  # percentage
-        discount_amount = subtotal * (budget_data.discount_percentage / 100)
-    
-    total = subtotal - discount_amount
-    
     budget_dict = budget_data.dict()
+    budget_dict["items"] = await snapshot_budget_items(budget_dict["items"])
+    budget_dict.update(calculate_budget_totals(
+        budget_dict["items"], budget_data.discount_percentage, budget_data.discount_type
+    ))
     budget_dict.update({
         "client_name": client["name"],
         "seller_name": seller_name,
-        "subtotal": subtotal,
-        "discount_amount": discount_amount,
-        "total": total,
         "created_by": current_user.username
     })
     
     budget_obj = Budget(**budget_dict)
     await db.budgets.insert_one(budget_obj.dict())
+    await update_budget_rollups(None, budget_obj.dict())
     
     # Create history entry
     history_entry = BudgetHistory(
@@ -661,16 +1792,21 @@ async def create_budget(budget_data: BudgetCreate, current_user: User = Depends(
     
     return budget_obj
 
-@api_router.get("/budgets", response_model=List[Budget])
-async def get_budgets(
-    current_user: User = Depends(get_current_user),
+@api_router.post("/budgets/quote", response_model=BudgetQuote)
+async def quote_budget(quote_data: BudgetQuoteRequest, current_user: User = Depends(get_current_user)):
+    # Dry run of the pricing used by create/update; nothing is written
+    items = await snapshot_budget_items([item.dict() for item in quote_data.items])
+    totals = calculate_budget_totals(items, quote_data.discount_percentage, quote_data.discount_type)
+    return BudgetQuote(budget_type=quote_data.budget_type, **totals)
+
+def budget_filters(
     client_id: Optional[str] = None,
     seller_id: Optional[str] = None,
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
-):
-    # Build query filters
+) -> Dict[str, Any]:
+    """Build the budgets query shared by the list, export and search routes"""
     query = {}
     
     if client_id:
@@ -690,18 +1826,308 @@ async def get_budgets(
             date_query["$lte"] = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         query["created_at"] = date_query
     
-    budgets = await db.budgets.find(query).sort("created_at", -1).to_list(1000)
-    return [Budget(**budget) for budget in budgets]
+    return query
+
+def budget_projection(
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated budget fields to return")
+) -> Optional[Dict[str, int]]:
+    """Mongo projection for the budget list; None means full documents"""
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(requested) - set(Budget.model_fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return {field: 1 for field in requested}
+    if view == "summary":
+        return {field: 1 for field in BudgetSummary.model_fields}
+    return None
+
+@api_router.get("/budgets", response_model=Union[List[Budget], List[BudgetSummary], List[Dict[str, Any]]])
+async def get_budgets(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    query: Dict[str, Any] = Depends(budget_filters),
+    page: PageParams = Depends(page_params),
+    projection: Optional[Dict[str, int]] = Depends(budget_projection)
+):
+    # view=summary skips the items array; fields= returns exactly the requested
+    # fields (plus id and the sort field) as plain dicts
+    budgets = await paginate(db.budgets, query, page, response, BUDGET_SORT_FIELDS, default_order="desc", projection=projection)
+    if projection is None:
+        return json_list_response(Budget, budgets, response)
+    if set(projection) == set(BudgetSummary.model_fields):
+        return json_list_response(BudgetSummary, budgets, response)
+    return json_list_response(Dict[str, Any], budgets, response)
+
+@api_router.get("/budgets/search", response_model=List[BudgetSearchResult])
+async def search_budgets(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    current_user: User = Depends(get_current_user),
+    query: Dict[str, Any] = Depends(budget_filters),
+    page: PageParams = Depends(page_params)
+):
+    # Full-text match on the budget_text index, ranked by relevance. The cursor is
+    # (score, id) of the last row, so it only applies to the same search terms.
+    match = {"$text": {"$search": q}, **query}
+    if page.include_total:
+        response.headers["X-Total-Count"] = str(await db.budgets.count_documents(match))
+    
+    pipeline = [
+        {"$match": match},
+        {"$project": {**BUDGET_SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}},
+    ]
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        if len(values) != 4 or values[:2] != ["relevance", q]:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last_score, last_id = values[2:]
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": last_score}},
+            {"score": last_score, "id": {"$lt": last_id}}
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "id": -1}},
+        {"$limit": page.limit + 1}
+    ]
+    
+    results = await db.budgets.aggregate(pipeline).to_list(page.limit + 1)
+    if len(results) > page.limit:
+        results = results[:page.limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(["relevance", q, results[-1]["score"], results[-1]["id"]])
+    return json_list_response(BudgetSearchResult, results, response)
+
+BUDGET_STATUS_LABELS = {
+    BudgetStatus.DRAFT.value: "Rascunho",
+    BudgetStatus.SENT.value: "Enviado",
+    BudgetStatus.APPROVED.value: "Aprovado",
+    BudgetStatus.REJECTED.value: "Rejeitado",
+}
+
+# Columns of the CSV export, in order
+BUDGET_EXPORT_COLUMNS = [
+    ("ID", lambda b: b["id"]),
+    ("Cliente", lambda b: b.get("client_name")),
+    ("Vendedor", lambda b: b.get("seller_name") or ""),
+    ("Tipo", lambda b: b.get("budget_type")),
+    ("Status", lambda b: BUDGET_STATUS_LABELS.get(b.get("status"), b.get("status"))),
+    ("Data", lambda b: b["created_at"].strftime("%d/%m/%Y")),
+    ("Itens", lambda b: len(b.get("items") or [])),
+    ("Subtotal", lambda b: f"{b.get('subtotal', 0):.2f}"),
+    ("Desconto", lambda b: f"{b.get('discount_amount', 0):.2f}"),
+    ("Total", lambda b: f"{b.get('total', 0):.2f}"),
+    ("Versão", lambda b: b.get("version", 1)),
+    ("Criado Por", lambda b: b.get("created_by")),
+]
+EXPORT_BATCH_SIZE = 500
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def stream_budgets_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")  # BOM so Excel detects UTF-8
+    writer.writerow([name for name, _ in BUDGET_EXPORT_COLUMNS])
+    rows = 0
+    async for budget in cursor:
+        writer.writerow([value(budget) for _, value in BUDGET_EXPORT_COLUMNS])
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+async def stream_budgets_ndjson(cursor):
+    lines = []
+    async for budget in cursor:
+        lines.append(json.dumps(budget, default=_json_default, ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@api_router.get("/budgets/export")
+async def export_budgets(
+    current_user: User = Depends(get_current_user),
+    query: Dict[str, Any] = Depends(budget_filters),
+    format: str = Query("csv", pattern="^(csv|ndjson)$")
+):
+    cursor = db.budgets.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"orcamentos-{datetime.now(timezone.utc).strftime('%Y-%m-%d')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    if format == "ndjson":
+        return StreamingResponse(stream_budgets_ndjson(cursor), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(stream_budgets_csv(cursor), media_type="text/csv; charset=utf-8", headers=headers)
+
+MAX_IMPORT_ROWS = 5000
+
+async def read_import_rows(request: Request) -> List[Any]:
+    """Parse a bulk import body, either a JSON array or NDJSON (one object per line)"""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON rows")
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_ROWS} rows per import")
+    return rows
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors())
+
+@api_router.post("/budgets/import")
+async def import_budgets(request: Request, current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can import budgets")
+    
+    rows = await read_import_rows(request)
+    errors = []
+    
+    parsed = []
+    for index, row in enumerate(rows):
+        try:
+            parsed.append((index, BudgetImportRow.model_validate(row)))
+        except ValidationError as e:
+            errors.append({"row": index, "error": _validation_message(e)})
+    
+    # Resolve every referenced client and seller with one query each
+    client_ids = list({row.client_id for _, row in parsed})
+    seller_ids = list({row.seller_id for _, row in parsed if row.seller_id})
+    item_ids = list({item.item_id for _, row in parsed for item in row.items})
+    clients, sellers, catalog = await asyncio.gather(
+        db.clients.find({"id": {"$in": client_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None),
+        db.sellers.find({"id": {"$in": seller_ids}}, {"_id": 0, "id": 1, "name": 1, "commission_percentage": 1}).to_list(None),
+        get_catalog_entries(item_ids)
+    )
+    clients_by_id = {c["id"]: c for c in clients}
+    sellers_by_id = {seller["id"]: seller for seller in sellers}
+    
+    budgets = []
+    for index, row in parsed:
+        client = clients_by_id.get(row.client_id)
+        if not client:
+            errors.append({"row": index, "error": "Client not found"})
+            continue
+        seller = sellers_by_id.get(row.seller_id) if row.seller_id else None
+        if row.seller_id and not seller:
+            errors.append({"row": index, "error": "Seller not found"})
+            continue
+        
+        budget_dict = row.dict(exclude_none=True)
+        try:
+            # Imported budgets keep the unit prices they were sold at
+            budget_dict["items"] = apply_catalog_snapshot(budget_dict["items"], catalog, keep_prices=True)
+        except HTTPException as e:
+            errors.append({"row": index, "error": e.detail})
+            continue
+        budget_dict.update(calculate_budget_totals(budget_dict["items"], row.discount_percentage, row.discount_type))
+        budget_dict.update({
+            "client_name": client["name"],
+            "seller_name": seller["name"] if seller else None,
+            "created_by": current_user.username
+        })
+        if row.created_at:
+            budget_dict["updated_at"] = row.created_at
+        budget_obj = Budget(**budget_dict)
+        budgets.append((index, budget_obj, budget_obj.dict()))
+    
+    # Unordered insert: one bad document does not stop the rest of the batch
+    inserted = list(budgets)
+    if budgets:
+        try:
+            await db.budgets.insert_many([dict(doc) for _, _, doc in budgets], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+            for position, message in failed.items():
+                errors.append({"row": budgets[position][0], "error": message})
+            inserted = [entry for position, entry in enumerate(budgets) if position not in failed]
+    
+    if inserted:
+        history_entries = [
+            BudgetHistory(
+                budget_id=budget.id,
+                changes={"action": "imported", "budget": doc},
+                changed_by=current_user.username,
+                change_reason="Budget imported"
+            ).dict()
+            for _, budget, doc in inserted
+        ]
+        commissions = [
+            Commission(
+                budget_id=budget.id,
+                seller_id=budget.seller_id,
+                seller_name=budget.seller_name,
+                budget_total=budget.total,
+                commission_percentage=sellers_by_id[budget.seller_id]["commission_percentage"],
+                commission_amount=budget.total * (sellers_by_id[budget.seller_id]["commission_percentage"] / 100),
+                status=CommissionStatus.CALCULATED
+            ).dict()
+            for _, budget, _ in inserted
+            if budget.seller_id and budget.status == BudgetStatus.APPROVED
+        ]
+        writes = [
+            db.budget_history.insert_many(history_entries, ordered=False),
+            apply_budget_rollup_changes([(doc, 1) for _, _, doc in inserted])
+        ]
+        if commissions:
+            writes.append(db.commissions.insert_many(commissions, ordered=False))
+        await asyncio.gather(*writes)
+    
+    return {
+        "received": len(rows),
+        "created": len(inserted),
+        "created_ids": [budget.id for _, budget, _ in inserted],
+        "errors": sorted(errors, key=lambda e: e["row"])
+    }
+
+def budget_etag(version: int) -> str:
+    return f'"{version}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    if not if_match or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+def budget_version_conflict(current_version: int) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Budget was modified by another user", "current_version": current_version},
+        headers={"ETag": budget_etag(current_version)}
+    )
 
 @api_router.get("/budgets/{budget_id}", response_model=Budget)
-async def get_budget(budget_id: str, current_user: User = Depends(get_current_user)):
+async def get_budget(budget_id: str, response: Response, current_user: User = Depends(get_current_user)):
     budget = await db.budgets.find_one({"id": budget_id})
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
+    # The version doubles as the ETag, to be sent back in If-Match when saving
+    response.headers["ETag"] = budget_etag(budget.get("version", 1))
     return Budget(**budget)
 
 @api_router.put("/budgets/{budget_id}", response_model=Budget)
-async def update_budget(budget_id: str, budget_data: BudgetUpdate, current_user: User = Depends(get_current_user)):
+async def update_budget(
+    budget_id: str,
+    budget_data: BudgetUpdate,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
     # Get existing budget
     existing_budget = await db.budgets.find_one({"id": budget_id})
     if not existing_budget:
@@ -709,25 +2135,26 @@ async def update_budget(budget_id: str, budget_data: BudgetUpdate, current_user:
     
     update_data = {k: v for k, v in budget_data.dict().items() if v is not None}
     
-    # If items are being updated, recalculate totals
+    # Optimistic concurrency: the caller's version must still be the current one
+    expected_version = parse_if_match(request.headers.get("if-match"))
+    body_version = update_data.pop("version", None)
+    if expected_version is None:
+        expected_version = body_version
+    current_version = existing_budget.get("version", 1)
+    if expected_version is not None and expected_version != current_version:
+        raise budget_version_conflict(current_version)
+    
+    # Lines keep the name and price they were quoted with; only added or switched
+    # items are priced from the catalog, so deactivated items don't block edits
     if "items" in update_data:
-        subtotal = sum(item.get("final_price") or item.get("subtotal", 0) for item in update_data["items"])
+        update_data["items"] = await snapshot_budget_items(update_data["items"], existing_budget.get("items", []))
+    
+    # If items or the discount are being updated, reprice the budget
+    if {"items", "discount_percentage", "discount_type"} & update_data.keys():
+        items = update_data.get("items", existing_budget.get("items", []))
         discount_percentage = update_data.get("discount_percentage", existing_budget.get("discount_percentage", 0))
         discount_type = update_data.get("discount_type", existing_budget.get("discount_type", "percentage"))
-        
-        # Calculate discount based on type
-        if discount_type == "fixed":
-            discount_amount = discount_percentage  # When type is "fixed", discount_percentage contains the fixed amount
-        else:  # percentage
-            discount_amount = subtotal * (discount_percentage / 100)
-        
-        total = subtotal - discount_amount
-        
-        update_data.update({
-            "subtotal": subtotal,
-            "discount_amount": discount_amount,
-            "total": total
-        })
+        update_data.update(calculate_budget_totals(items, discount_percentage, discount_type))
     
     # If client is being updated, get client name
     if "client_id" in update_data:
@@ -747,23 +2174,32 @@ async def update_budget(budget_id: str, budget_data: BudgetUpdate, current_user:
             update_data["seller_name"] = None
     
     update_data["updated_at"] = datetime.now(timezone.utc)
-    update_data["version"] = existing_budget.get("version", 1) + 1
-    
-    result = await db.budgets.update_one({"id": budget_id}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Budget not found")
+    update_data["version"] = current_version + 1
+    
+    # The previous version is still read first: history, rollups and the approval
+    # check need it. Filtering on its version also rejects writes that landed in
+    # between (budgets written before versioning have no version field).
+    version_filter = {"version": current_version} if "version" in existing_budget else {"version": {"$exists": False}}
+    updated_budget = await db.budgets.find_one_and_update(
+        {"id": budget_id, **version_filter}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not updated_budget:
+        current = await db.budgets.find_one({"id": budget_id}, {"_id": 0, "version": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        raise budget_version_conflict(current.get("version", 1))
+    response.headers["ETag"] = budget_etag(updated_budget["version"])
+    budget_obj = Budget(**updated_budget)
     
-    # Create history entry
+    # Create history entry with only what changed since the previous version
     history_entry = BudgetHistory(
         budget_id=budget_id,
-        changes={"action": "updated", "changes": update_data},
+        changes={"action": "updated", "delta": diff_budget(existing_budget, updated_budget)},
         changed_by=current_user.username,
         change_reason="Budget updated"
     )
     await db.budget_history.insert_one(history_entry.dict())
-    
-    updated_budget = await db.budgets.find_one({"id": budget_id})
-    budget_obj = Budget(**updated_budget)
+    await update_budget_rollups(existing_budget, updated_budget)
     
     # Update or create commission if status changed to approved and seller is assigned
     if (update_data.get("status") == BudgetStatus.APPROVED and 
@@ -790,11 +2226,13 @@ async def delete_budget(budget_id: str, current_user: User = Depends(get_current
     result = await db.budgets.delete_one({"id": budget_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Budget not found")
+    await update_budget_rollups(existing_budget, None)
     
     # Create history entry for deletion
     history_entry = BudgetHistory(
         budget_id=budget_id,
-        changes={"action": "deleted", "budget": existing_budget},
+        # The earlier history is gone, this full copy is the only record of the budget
+        changes={"action": "deleted", "budget": {k: v for k, v in existing_budget.items() if k != "_id"}},
         changed_by=current_user.username,
         change_reason="Budget deleted"
     )
@@ -822,11 +2260,12 @@ async def duplicate_budget(budget_id: str, current_user: User = Depends(get_curr
     
     new_budget_obj = Budget(**new_budget_dict)
     await db.budgets.insert_one(new_budget_obj.dict())
+    await update_budget_rollups(None, new_budget_obj.dict())
     
     # Create history entry
     history_entry = BudgetHistory(
         budget_id=new_budget_obj.id,
-        changes={"action": "duplicated_from", "original_budget_id": budget_id},
+        changes={"action": "duplicated_from", "original_budget_id": budget_id, "budget": new_budget_obj.dict()},
         changed_by=current_user.username,
         change_reason=f"Budget duplicated from {budget_id}"
     )
@@ -835,9 +2274,20 @@ async def duplicate_budget(budget_id: str, current_user: User = Depends(get_curr
     return new_budget_obj
 
 @api_router.get("/budgets/{budget_id}/history", response_model=List[BudgetHistory])
-async def get_budget_history(budget_id: str, current_user: User = Depends(get_current_user)):
-    history = await db.budget_history.find({"budget_id": budget_id}).sort("created_at", -1).to_list(1000)
-    return [BudgetHistory(**entry) for entry in history]
+async def get_budget_history(
+    budget_id: str,
+    response: Response,
+    expand: bool = True,
+    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params)
+):
+    # expand=false returns the stored deltas as they are
+    history = await paginate(
+        db.budget_history, {"budget_id": budget_id}, page, response, BUDGET_HISTORY_SORT_FIELDS, default_order="desc"
+    )
+    if expand:
+        history = await expand_budget_history(budget_id, history)
+    return json_list_response(BudgetHistory, history, response)
 
 # Commission routes
 async def create_commission_for_budget(budget: Budget, created_by: str):
@@ -906,11 +2356,13 @@ async def create_commission(commission_data: CommissionCreate, current_user: Use
 
 @api_router.get("/commissions", response_model=List[Commission])
 async def get_commissions(
+    response: Response,
     current_user: User = Depends(get_current_user),
     seller_id: Optional[str] = None,
     status: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    page: PageParams = Depends(page_params)
 ):
     # Build query filters
     query = {}
@@ -929,8 +2381,8 @@ async def get_commissions(
             date_query["$lte"] = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         query["created_at"] = date_query
     
-    commissions = await db.commissions.find(query).sort("created_at", -1).to_list(1000)
-    return [Commission(**commission) for commission in commissions]
+    commissions = await paginate(db.commissions, query, page, response, COMMISSION_SORT_FIELDS, default_order="desc")
+    return json_list_response(Commission, commissions, response)
 
 @api_router.get("/commissions/summary")
 async def get_commissions_summary(
@@ -985,20 +2437,18 @@ async def update_commission(commission_id: str, commission_data: CommissionUpdat
     update_data = {k: v for k, v in commission_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    # If commission percentage is updated, recalculate amount
-    existing_commission = await db.commissions.find_one({"id": commission_id})
-    if not existing_commission:
-        raise HTTPException(status_code=404, detail="Commission not found")
-    
+    # Pipeline update: the amount is derived from the stored budget_total in the same write
+    pipeline = [{"$set": {k: {"$literal": v} for k, v in update_data.items()}}]
     if "commission_percentage" in update_data:
-        budget_total = existing_commission["budget_total"]
-        update_data["commission_amount"] = budget_total * (update_data["commission_percentage"] / 100)
+        pipeline.append({"$set": {
+            "commission_amount": {"$multiply": ["$budget_total", update_data["commission_percentage"] / 100]}
+        }})
     
-    result = await db.commissions.update_one({"id": commission_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    updated_commission = await db.commissions.find_one_and_update(
+        {"id": commission_id}, pipeline, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not updated_commission:
         raise HTTPException(status_code=404, detail="Commission not found")
-    
-    updated_commission = await db.commissions.find_one({"id": commission_id})
     return Commission(**updated_commission)
 
 @api_router.delete("/commissions/{commission_id}")
@@ -1008,10 +2458,284 @@ async def delete_commission(commission_id: str, current_user: User = Depends(get
         raise HTTPException(status_code=404, detail="Commission not found")
     return {"message": "Commission deleted successfully"}
 
+# Dashboard routes
+BUDGET_SUMMARY_PROJECTION = {field: 1 for field in BudgetSummary.model_fields}
+BUDGET_SUMMARY_PROJECTION["_id"] = 0
+
+@api_router.get("/dashboard/stats", response_model=DashboardStats)
+async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+    # Independent index-backed queries run concurrently; a single $facet would
+    # have to stream every budget through the pipeline since facets cannot use indexes
+    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    revenue_pipeline = [
+        {"$match": {"month": month_start.strftime("%Y-%m"), "status": BudgetStatus.APPROVED.value}},
+        {"$group": {"_id": None, "total": {"$sum": "$total"}}}
+    ]
+    
+    total_clients, total_budgets, recent_budgets, revenue = await asyncio.gather(
+        db.clients.estimated_document_count(),
+        db.budgets.estimated_document_count(),
+        db.budgets.find({}, BUDGET_SUMMARY_PROJECTION).sort([("created_at", -1), ("id", -1)]).limit(5).to_list(5),
+        db.budget_rollups.aggregate(revenue_pipeline).to_list(1)
+    )
+    
+    return DashboardStats(
+        total_clients=total_clients,
+        total_budgets=total_budgets,
+        recent_budgets=recent_budgets,
+        monthly_revenue=revenue[0]["total"] if revenue else 0.0,
+        month=month_start.strftime("%Y-%m")
+    )
+
+# Budget types are static, their ETag only changes with the enum itself
+BUDGET_TYPES_ETAG = "budget-types-" + hashlib.sha1("|".join(bt.value for bt in BudgetType).encode()).hexdigest()[:12]
+
 @api_router.get("/budget-types")
-async def get_budget_types(current_user: User = Depends(get_current_user)):
+async def get_budget_types(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    not_modified = not_modified_response(request, response, make_etag(BUDGET_TYPES_ETAG, request))
+    if not_modified:
+        return not_modified
+    
     return {"budget_types": [{"value": bt.value, "label": bt.value} for bt in BudgetType]}
 
+# Budget creator bootstrap
+# Collection, active-only filter and sort of each section, matching the list routes
+BOOTSTRAP_SECTIONS = {
+    "clients": ("clients", {}, "name"),
+    "sellers": ("sellers", {"active": True}, "name"),
+    "price_table": ("price_table", {"active": True}, "code"),
+    "canvas_colors": ("canvas_colors", {"active": True}, "name"),
+}
+
+@api_router.get("/budget-creator/bootstrap", response_model=BudgetCreatorBootstrap)
+async def get_budget_creator_bootstrap(
+    clients_etag: Optional[str] = None,
+    sellers_etag: Optional[str] = None,
+    price_table_etag: Optional[str] = None,
+    canvas_colors_etag: Optional[str] = None,
+    budget_types_etag: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    # Everything the budget form needs behind a single authentication; sections
+    # whose ETag the client sent back unchanged are skipped
+    known_etags = {
+        "clients": clients_etag,
+        "sellers": sellers_etag,
+        "price_table": price_table_etag,
+        "canvas_colors": canvas_colors_etag,
+        "budget_types": budget_types_etag,
+    }
+    
+    versions = await db.collection_versions.find({"_id": {"$in": list(BOOTSTRAP_SECTIONS)}}).to_list(None)
+    version_by_collection = {version["_id"]: version["version"] for version in versions}
+    
+    etags = {
+        section: f'W/"{collection}-{version_by_collection.get(collection, 0)}"'
+        for section, (collection, _, _) in BOOTSTRAP_SECTIONS.items()
+    }
+    etags["budget_types"] = f'W/"{BUDGET_TYPES_ETAG}"'
+    
+    stale_sections = [section for section in BOOTSTRAP_SECTIONS if known_etags[section] != etags[section]]
+    results = await asyncio.gather(*[
+        db[BOOTSTRAP_SECTIONS[section][0]].find(BOOTSTRAP_SECTIONS[section][1], {"_id": 0})
+        .sort([(BOOTSTRAP_SECTIONS[section][2], 1), ("id", 1)]).to_list(None)
+        for section in stale_sections
+    ])
+    
+    payload = dict(zip(stale_sections, results))
+    if known_etags["budget_types"] != etags["budget_types"]:
+        payload["budget_types"] = [{"value": bt.value, "label": bt.value} for bt in BudgetType]
+    
+    return BudgetCreatorBootstrap(etags=etags, **payload)
+
+# Database indexes
+# Every collection is looked up by its UUID "id"; the compound indexes back the
+# filters + created_at sort used by the list routes. Unique indexes enforce the
+# duplicate rules of the create/update routes, which report DuplicateKeyError as 400.
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "clients": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)], name="name_id"),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        IndexModel(
+            [("name_key", ASCENDING)],
+            name="name_key_unique",
+            unique=True,
+            partialFilterExpression={"name_key": {"$exists": True}}
+        ),
+        IndexModel(
+            [("phone", ASCENDING)],
+            name="phone_unique",
+            unique=True,
+            partialFilterExpression={"phone": {"$gt": ""}}
+        ),
+        IndexModel([("search_tokens", ASCENDING)], name="search_tokens"),
+    ],
+    "sellers": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("name_key", ASCENDING)],
+            name="name_key_unique",
+            unique=True,
+            partialFilterExpression={"name_key": {"$exists": True}}
+        ),
+        IndexModel(
+            [("registration_number", ASCENDING)],
+            name="registration_number_unique",
+            unique=True,
+            partialFilterExpression={"registration_number": {"$gt": ""}}
+        ),
+        IndexModel([("active", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)], name="active_name_id"),
+        IndexModel([("active", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], name="active_created_at_id"),
+    ],
+    "canvas_colors": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("name", ASCENDING)],
+            name="name_active_unique",
+            unique=True,
+            partialFilterExpression={"active": True}
+        ),
+        IndexModel([("active", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)], name="active_name_id"),
+    ],
+    "price_table": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("code", ASCENDING)],
+            name="code_active_unique",
+            unique=True,
+            partialFilterExpression={"active": True}
+        ),
+        IndexModel([("active", ASCENDING), ("code", ASCENDING), ("id", ASCENDING)], name="active_code_id"),
+        IndexModel([("active", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)], name="active_name_id"),
+        IndexModel([("active", ASCENDING), ("category", ASCENDING), ("id", ASCENDING)], name="active_category_id"),
+    ],
+    "budgets": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("total", DESCENDING), ("id", DESCENDING)], name="total_id"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="status_created_at_id"
+        ),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_created_at_id"
+        ),
+        IndexModel(
+            [("seller_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="seller_created_at_id"
+        ),
+        # Weighted full-text index for /budgets/search; Portuguese stemming, diacritic-insensitive
+        IndexModel(
+            [("client_name", TEXT), ("items.item_name", TEXT), ("installation_location", TEXT), ("observations", TEXT)],
+            name="budget_text",
+            weights={"client_name": 10, "items.item_name": 5, "installation_location": 3, "observations": 1},
+            default_language="portuguese"
+        ),
+    ],
+    "commissions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("budget_id", ASCENDING)], name="budget_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("commission_amount", DESCENDING), ("id", DESCENDING)], name="commission_amount_id"),
+        IndexModel(
+            [("seller_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="seller_created_at_id"
+        ),
+    ],
+    "budget_rollups": [
+        IndexModel(
+            [("month", ASCENDING), ("status", ASCENDING), ("budget_type", ASCENDING), ("seller_id", ASCENDING)],
+            name="rollup_key_unique",
+            unique=True
+        ),
+    ],
+    "budget_history": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("budget_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="budget_created_at_id"
+        ),
+    ],
+    "name_propagation_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+}
+
+# Options that make two indexes with the same name different
+INDEX_OPTIONS = ("unique", "partialFilterExpression", "sparse", "collation")
+
+def _index_signature(index: dict) -> dict:
+    """Normalize an index spec (declared or from index_information) for comparison"""
+    key = index["key"].items() if isinstance(index["key"], dict) else index["key"]
+    if any(direction == TEXT for _, direction in key):
+        # Text indexes are stored as _fts/_ftsx, with their fields moved into weights
+        signature = {
+            "key": [("_fts", TEXT), ("_ftsx", 1)],
+            "weights": dict(index.get("weights") or {}),
+            "default_language": index.get("default_language", "english")
+        }
+    else:
+        signature = {"key": [(field, int(direction)) for field, direction in key]}
+    for option in INDEX_OPTIONS:
+        if index.get(option):
+            signature[option] = index[option]
+    return signature
+
+async def ensure_indexes():
+    """Create every declared index, one at a time so a single failure does not block the rest"""
+    for collection_name, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection_name].create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"Could not create index {collection_name}.{model.document['name']}: {e}")
+
+async def get_index_drift() -> Dict[str, Any]:
+    """Compare declared indexes against the ones that actually exist"""
+    report = {}
+    for collection_name, models in INDEXES.items():
+        actual = await db[collection_name].index_information()
+        actual.pop("_id_", None)
+        declared = {model.document["name"]: model.document for model in models}
+        
+        missing = [name for name in declared if name not in actual]
+        extra = [name for name in actual if name not in declared]
+        mismatched = [
+            name for name in declared
+            if name in actual and _index_signature(declared[name]) != _index_signature(actual[name])
+        ]
+        report[collection_name] = {
+            "missing": missing,
+            "extra": extra,
+            "mismatched": mismatched,
+            "in_sync": not (missing or extra or mismatched)
+        }
+    return report
+
+@api_router.get("/admin/indexes")
+async def get_indexes_report(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can inspect indexes")
+    
+    return {"collections": await get_index_drift()}
+
+@api_router.post("/admin/indexes")
+async def sync_indexes(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can manage indexes")
+    
+    await ensure_indexes()
+    return {"collections": await get_index_drift()}
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1021,6 +2745,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified"],
 )
 
 # Configure logging
@@ -1030,6 +2755,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes()
+    drift = await get_index_drift()
+    for collection_name, entry in drift.items():
+        if not entry["in_sync"]:
+            logger.warning(f"Index drift on {collection_name}: {entry}")
+    # Before serving requests, so no budget write can $inc rows that are about to be built
+    await ensure_budget_rollups()
+    # name_key_unique only rejects duplicates of documents that already have a key
+    name_keys = await backfill_name_keys()
+    for collection_name, result in name_keys.items():
+        if result["conflicts"]:
+            logger.warning(f"Duplicate {collection_name} names left without name_key: {result['conflicts']}")
+    await backfill_derived_field(db.clients, "search_tokens", CLIENT_SEARCH_FIELDS, client_search_tokens)
+    # Warm the price catalog; a failure is logged and the first lookups retry it
+    await asyncio.wait([schedule_price_catalog_refresh()])
+    await resume_name_propagation_jobs()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    password_executor.shutdown(wait=False)
\ No newline at end of file
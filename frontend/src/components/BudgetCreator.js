@@ -23,12 +23,16 @@ import {
   Settings
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 import { useNavigate, useParams } from 'react-router-dom';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Sections of the last bootstrap response, reused while their ETag is unchanged
+const bootstrapCache = { etags: {}, data: {} };
+
 const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
   const navigate = useNavigate();
   const { budgetId } = useParams();
@@ -40,6 +44,9 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
   const [canvasColors, setCanvasColors] = useState([]);
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
+  const [budgetVersion, setBudgetVersion] = useState(null);
+  const [clientQuery, setClientQuery] = useState('');
+  const [clientResults, setClientResults] = useState(null);
   
   // Client dialog states
   const [isClientDialogOpen, setIsClientDialogOpen] = useState(false);
@@ -102,10 +109,34 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
     }
   }, [isEditMode]);
 
+  // Client typeahead: matching happens on the server, a moment after the last keystroke
+  useEffect(() => {
+    if (clientQuery.trim().length < 2) {
+      setClientResults(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/clients/search`, { params: { q: clientQuery, limit: 20 } });
+        setClientResults(response.data);
+      } catch (error) {
+        console.error('Error searching clients:', error);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [clientQuery]);
+
+  // Keep the selected client listed so the Select can still show its label
+  const selectedClient = clients.find(c => c.id === formData.client_id);
+  const clientOptions = clientResults === null
+    ? clients
+    : [...(selectedClient && !clientResults.some(c => c.id === selectedClient.id) ? [selectedClient] : []), ...clientResults];
+
   const fetchBudgetData = async () => {
     try {
       const response = await axios.get(`${API}/budgets/${budgetId}`);
       const budget = response.data;
+      setBudgetVersion(budget.version);
       
       // Carregar dados do orçamento nos formulários
       setFormData({
@@ -151,19 +182,25 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
 
   const fetchInitialData = async () => {
     try {
-      const [clientsRes, sellersRes, priceItemsRes, budgetTypesRes, colorsRes] = await Promise.all([
-        axios.get(`${API}/clients`),
-        axios.get(`${API}/sellers`),
-        axios.get(`${API}/price-table`),
-        axios.get(`${API}/budget-types`),
-        axios.get(`${API}/canvas-colors`)
-      ]);
-
-      setClients(clientsRes.data);
-      setSellers(sellersRes.data);
-      setPriceItems(priceItemsRes.data);
-      setBudgetTypes(budgetTypesRes.data.budget_types);
-      setCanvasColors(colorsRes.data);
+      const params = {};
+      Object.entries(bootstrapCache.etags).forEach(([section, etag]) => {
+        params[`${section}_etag`] = etag;
+      });
+      const response = await axios.get(`${API}/budget-creator/bootstrap`, { params });
+      
+      // Sections come back null when our cached copy is still current
+      Object.entries(response.data.etags).forEach(([section, etag]) => {
+        if (response.data[section] !== null) {
+          bootstrapCache.data[section] = response.data[section];
+          bootstrapCache.etags[section] = etag;
+        }
+      });
+
+      setClients(bootstrapCache.data.clients || []);
+      setSellers(bootstrapCache.data.sellers || []);
+      setPriceItems(bootstrapCache.data.price_table || []);
+      setBudgetTypes(bootstrapCache.data.budget_types || []);
+      setCanvasColors(bootstrapCache.data.canvas_colors || []);
     } catch (error) {
       console.error('Error fetching initial data:', error);
       if (error.response?.status === 401 && onAuthError) {
@@ -178,7 +215,7 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
 
   const fetchClients = async () => {
     try {
-      const response = await axios.get(`${API}/clients`);
+      const response = await fetchAllPages(`${API}/clients`);
       setClients(response.data);
     } catch (error) {
       console.error('Error fetching clients:', error);
@@ -190,7 +227,7 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
 
   const fetchCanvasColors = async () => {
     try {
-      const response = await axios.get(`${API}/canvas-colors`);
+      const response = await fetchAllPages(`${API}/canvas-colors`);
       setCanvasColors(response.data);
     } catch (error) {
       console.error('Error fetching canvas colors:', error);
@@ -511,7 +548,8 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
       };
 
       if (isEditMode) {
-        const response = await axios.put(`${API}/budgets/${budgetId}`, budgetData);
+        // The version we loaded; the server answers 409 if someone saved in between
+        const response = await axios.put(`${API}/budgets/${budgetId}`, { ...budgetData, version: budgetVersion });
         toast.success('Orçamento atualizado com sucesso!');
       } else {
         const response = await axios.post(`${API}/budgets`, budgetData);
@@ -522,6 +560,8 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
       console.error(`Error ${isEditMode ? 'updating' : 'creating'} budget:`, error);
       if (error.response?.status === 401 && onAuthError) {
         onAuthError();
+      } else if (error.response?.status === 409) {
+        toast.error('Este orçamento foi alterado por outro usuário. Recarregue a página para ver a versão atual.');
       } else {
         toast.error(`Erro ao ${isEditMode ? 'atualizar' : 'criar'} orçamento`);
       }
@@ -574,13 +614,18 @@ const BudgetCreator = ({ user, onAuthError, mode = "create" }) => {
             <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
               <div className="space-y-2">
                 <Label htmlFor="client">Cliente *</Label>
+                <Input
+                  placeholder="Buscar por nome, contato, telefone, cidade ou CEP..."
+                  value={clientQuery}
+                  onChange={(e) => setClientQuery(e.target.value)}
+                />
                 <div className="flex space-x-2">
                   <Select value={formData.client_id || ""} onValueChange={(value) => handleFormChange('client_id', value)}>
                     <SelectTrigger className="flex-1">
                       <SelectValue placeholder="Selecione o cliente" />
                     </SelectTrigger>
                     <SelectContent>
-                      {clients.map((client) => (
+                      {clientOptions.map((client) => (
                         <SelectItem key={client.id} value={client.id}>
                           {client.name} - {client.contact_name}
                         </SelectItem>
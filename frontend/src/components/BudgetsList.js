@@ -28,6 +28,7 @@ import {
   Trash2
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 import { Link } from 'react-router-dom';
 
@@ -36,6 +37,8 @@ const API = `${BACKEND_URL}/api`;
 
 const BudgetsList = ({ onAuthError }) => {
   const [budgets, setBudgets] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [clients, setClients] = useState([]);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
@@ -58,11 +61,12 @@ const BudgetsList = ({ onAuthError }) => {
     try {
       const [budgetsRes, clientsRes, budgetTypesRes] = await Promise.all([
         axios.get(`${API}/budgets`),
-        axios.get(`${API}/clients`),
+        fetchAllPages(`${API}/clients`),
         axios.get(`${API}/budget-types`)
       ]);
 
       setBudgets(budgetsRes.data);
+      setNextCursor(budgetsRes.headers['x-next-cursor'] || null);
       setClients(clientsRes.data);
       setBudgetTypes(budgetTypesRes.data.budget_types);
     } catch (error) {
@@ -77,29 +81,34 @@ const BudgetsList = ({ onAuthError }) => {
     }
   };
 
+  const buildBudgetParams = () => {
+    const params = new URLSearchParams();
+    
+    if (selectedClient !== 'all') {
+      params.append('client_id', selectedClient);
+    }
+    
+    if (selectedStatus !== 'all') {
+      params.append('status', selectedStatus);
+    }
+    
+    if (startDate) {
+      params.append('start_date', startDate + 'T00:00:00Z');
+    }
+    
+    if (endDate) {
+      params.append('end_date', endDate + 'T23:59:59Z');
+    }
+
+    return params;
+  };
+
   const fetchBudgets = async () => {
     try {
-      // Build query parameters
-      const params = new URLSearchParams();
-      
-      if (selectedClient !== 'all') {
-        params.append('client_id', selectedClient);
-      }
-      
-      if (selectedStatus !== 'all') {
-        params.append('status', selectedStatus);
-      }
-      
-      if (startDate) {
-        params.append('start_date', startDate + 'T00:00:00Z');
-      }
-      
-      if (endDate) {
-        params.append('end_date', endDate + 'T23:59:59Z');
-      }
-
+      const params = buildBudgetParams();
       const response = await axios.get(`${API}/budgets?${params.toString()}`);
       setBudgets(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching budgets:', error);
       if (error.response?.status === 401 && onAuthError) {
@@ -110,6 +119,28 @@ const BudgetsList = ({ onAuthError }) => {
     }
   };
 
+  const fetchMoreBudgets = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    try {
+      const params = buildBudgetParams();
+      params.append('cursor', nextCursor);
+      const response = await axios.get(`${API}/budgets?${params.toString()}`);
+      setBudgets(prev => [...prev, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more budgets:', error);
+      if (error.response?.status === 401 && onAuthError) {
+        onAuthError();
+      } else {
+        toast.error('Erro ao carregar orçamentos');
+      }
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchBudgetHistory = async (budgetId) => {
     try {
       const response = await axios.get(`${API}/budgets/${budgetId}/history`);
@@ -371,33 +402,32 @@ const BudgetsList = ({ onAuthError }) => {
     }, 500);
   };
 
-  const exportBudgetsToCSV = () => {
-    const csvContent = [
-      // Header
-      ['ID', 'Cliente', 'Tipo', 'Status', 'Data', 'Subtotal', 'Desconto', 'Total', 'Criado Por'].join(','),
-      // Data rows
-      ...filteredBudgets.map(budget => [
-        budget.id.slice(0, 8),
-        budget.client_name,
-        budget.budget_type,
-        getStatusLabel(budget.status),
-        new Date(budget.created_at).toLocaleDateString('pt-BR'),
-        budget.subtotal.toFixed(2),
-        budget.discount_amount.toFixed(2),
-        budget.total.toFixed(2),
-        budget.created_by
-      ].join(','))
-    ].join('\n');
-
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
-    link.setAttribute('download', `orcamentos-${new Date().toISOString().split('T')[0]}.csv`);
-    link.style.visibility = 'hidden';
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+  const exportBudgetsToCSV = async () => {
+    try {
+      // The server streams every budget matching the filters, not just the loaded pages
+      const params = buildBudgetParams();
+      params.append('format', 'csv');
+      const response = await axios.get(`${API}/budgets/export?${params.toString()}`, {
+        responseType: 'blob'
+      });
+
+      const link = document.createElement('a');
+      const url = URL.createObjectURL(response.data);
+      link.setAttribute('href', url);
+      link.setAttribute('download', `orcamentos-${new Date().toISOString().split('T')[0]}.csv`);
+      link.style.visibility = 'hidden';
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Error exporting budgets:', error);
+      if (error.response?.status === 401 && onAuthError) {
+        onAuthError();
+      } else {
+        toast.error('Erro ao exportar orçamentos');
+      }
+    }
   };
 
   const getStatusColor = (status) => {
@@ -784,6 +814,13 @@ const BudgetsList = ({ onAuthError }) => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="flex justify-center pt-2">
+                  <Button variant="outline" onClick={fetchMoreBudgets} disabled={loadingMore}>
+                    {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                  </Button>
+                </div>
+              )}
             </div>
           ) : (
             <div className="text-center py-12">
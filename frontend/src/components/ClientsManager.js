@@ -17,6 +17,7 @@ import {
   User
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -43,7 +44,7 @@ const ClientsManager = () => {
 
   const fetchClients = async () => {
     try {
-      const response = await axios.get(`${API}/clients`);
+      const response = await fetchAllPages(`${API}/clients`);
       setClients(response.data);
     } catch (error) {
       console.error('Error fetching clients:', error);
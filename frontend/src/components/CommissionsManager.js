@@ -19,6 +19,7 @@ import {
   Eye
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -42,8 +43,8 @@ const CommissionsManager = () => {
   const fetchInitialData = async () => {
     try {
       const [commissionsRes, sellersRes, summaryRes] = await Promise.all([
-        axios.get(`${API}/commissions`),
-        axios.get(`${API}/sellers`),
+        fetchAllPages(`${API}/commissions`),
+        fetchAllPages(`${API}/sellers`),
         axios.get(`${API}/commissions/summary`)
       ]);
 
@@ -80,7 +81,7 @@ const CommissionsManager = () => {
       }
 
       const [commissionsRes, summaryRes] = await Promise.all([
-        axios.get(`${API}/commissions?${params.toString()}`),
+        fetchAllPages(`${API}/commissions?${params.toString()}`),
         axios.get(`${API}/commissions/summary?${params.toString()}`)
       ]);
 
@@ -30,31 +30,14 @@ const Dashboard = ({ user }) => {
 
   const fetchDashboardData = async () => {
     try {
-      const [clientsRes, budgetsRes] = await Promise.all([
-        axios.get(`${API}/clients`),
-        axios.get(`${API}/budgets`)
-      ]);
-
-      const clients = clientsRes.data;
-      const budgets = budgetsRes.data;
-
-      // Calculate monthly revenue (current month)
-      const currentMonth = new Date().getMonth();
-      const currentYear = new Date().getFullYear();
-      const monthlyRevenue = budgets
-        .filter(budget => {
-          const budgetDate = new Date(budget.created_at);
-          return budgetDate.getMonth() === currentMonth && 
-                 budgetDate.getFullYear() === currentYear &&
-                 budget.status === 'APPROVED';
-        })
-        .reduce((sum, budget) => sum + budget.total, 0);
+      const response = await axios.get(`${API}/dashboard/stats`);
+      const data = response.data;
 
       setStats({
-        totalClients: clients.length,
-        totalBudgets: budgets.length,
-        recentBudgets: budgets.slice(0, 5),
-        monthlyRevenue
+        totalClients: data.total_clients,
+        totalBudgets: data.total_budgets,
+        recentBudgets: data.recent_budgets,
+        monthlyRevenue: data.monthly_revenue
       });
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
@@ -21,6 +21,7 @@ import {
   RefreshCw
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -92,7 +93,7 @@ const PriceTableManager = ({ user }) => {
 
   const fetchItems = async () => {
     try {
-      const response = await axios.get(`${API}/price-table`);
+      const response = await fetchAllPages(`${API}/price-table`);
       setItems(response.data);
     } catch (error) {
       console.error('Error fetching price table:', error);
@@ -240,22 +241,11 @@ const PriceTableManager = ({ user }) => {
     ];
 
     try {
-      let successCount = 0;
-      let errorCount = 0;
-
-      for (const item of standardItems) {
-        try {
-          await axios.post(`${API}/price-table`, item);
-          successCount++;
-        } catch (error) {
-          if (error.response?.status === 400 && error.response?.data?.detail?.includes('already exists')) {
-            // Item já existe, ignorar
-          } else {
-            console.error(`Error importing item ${item.code}:`, error);
-            errorCount++;
-          }
-        }
-      }
+      const response = await axios.post(`${API}/price-table/bulk`, {
+        items: standardItems,
+        update_existing: false
+      });
+      const successCount = response.data.created;
 
       toast.success(`Importação concluída! ${successCount} itens adicionados.`);
       fetchItems();
@@ -19,6 +19,7 @@ import {
   TrendingUp
 } from 'lucide-react';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -45,7 +46,7 @@ const SellersManager = ({ onAuthError }) => {
 
   const fetchSellers = async () => {
     try {
-      const response = await axios.get(`${API}/sellers`);
+      const response = await fetchAllPages(`${API}/sellers`);
       setSellers(response.data);
     } catch (error) {
       console.error('Error fetching sellers:', error);
@@ -0,0 +1,18 @@
+import axios from 'axios';
+
+// Follows the X-Next-Cursor header of a paginated list endpoint and returns an
+// axios-like response whose data holds every page, for screens that need the full list.
+export async function fetchAllPages(url, pageSize = 1000) {
+  const separator = url.includes('?') ? '&' : '?';
+  const items = [];
+  let cursor = null;
+
+  do {
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await axios.get(`${url}${separator}limit=${pageSize}${cursorParam}`);
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'] || null;
+  } while (cursor);
+
+  return { data: items };
+}
@@ -0,0 +1,259 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from server import apply_budget_delta, compact_history_entries, diff_budget, replay_budget_history
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def make_item(item_id, quantity=1.0, unit_price=100.0):
+    return {
+        "item_id": item_id,
+        "item_name": f"Item {item_id}",
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "subtotal": quantity * unit_price,
+        "final_price": quantity * unit_price,
+    }
+
+
+def make_budget(**fields):
+    budget = {
+        "id": "budget-1",
+        "client_name": "Cliente",
+        "observations": "",
+        "items": [make_item("a"), make_item("b")],
+        "total": 200.0,
+        "version": 1,
+    }
+    budget.update(fields)
+    return budget
+
+
+def entry(index, changes):
+    return {"id": f"entry-{index}", "created_at": START + timedelta(minutes=index), "changes": changes}
+
+
+# diff_budget / apply_budget_delta
+
+def test_diff_budget_only_keeps_changed_fields():
+    old = make_budget()
+    new = make_budget(observations="Montagem no sábado", version=2)
+
+    delta = diff_budget(old, new)
+
+    assert delta == {"fields": {"observations": "Montagem no sábado", "version": 2}}
+
+
+def test_diff_budget_changed_item_fields():
+    old = make_budget()
+    new = make_budget(items=[make_item("a"), make_item("b", quantity=3.0)])
+
+    delta = diff_budget(old, new)
+
+    assert delta["items"] == {
+        "length": 2,
+        "changed": {"1": {"quantity": 3.0, "subtotal": 300.0, "final_price": 300.0}},
+        "appended": [],
+    }
+    assert apply_budget_delta(old, delta) == new
+
+
+def test_diff_budget_items_shrink():
+    old = make_budget()
+    new = make_budget(items=[make_item("a")])
+
+    delta = diff_budget(old, new)
+
+    assert delta["items"] == {"length": 1, "changed": {}, "appended": []}
+    assert apply_budget_delta(old, delta) == new
+
+
+def test_diff_budget_items_grow():
+    old = make_budget()
+    new = make_budget(items=[make_item("a"), make_item("b"), make_item("c")])
+
+    delta = diff_budget(old, new)
+
+    assert delta["items"] == {"length": 3, "changed": {}, "appended": [make_item("c")]}
+    assert apply_budget_delta(old, delta) == new
+
+
+def test_apply_budget_delta_does_not_mutate_base():
+    old = make_budget()
+    new = make_budget(items=[make_item("a", quantity=5.0)])
+
+    apply_budget_delta(old, diff_budget(old, new))
+
+    assert old == make_budget()
+
+
+# replay_budget_history
+
+def test_replay_expands_deltas_with_previous_values():
+    created = make_budget()
+    updated = make_budget(items=[make_item("a")], total=100.0, version=2)
+    entries = [
+        entry(0, {"action": "created", "budget": created}),
+        entry(1, {"action": "updated", "delta": diff_budget(created, updated)}),
+    ]
+
+    expanded = replay_budget_history(entries)
+
+    assert expanded["entry-0"] == entries[0]["changes"]
+    assert expanded["entry-1"] == {
+        "action": "updated",
+        "changes": {"total": 100.0, "version": 2, "items": [make_item("a")]},
+        "previous": {"total": 200.0, "version": 1, "items": created["items"]},
+    }
+
+
+def test_replay_orders_entries_chronologically():
+    created = make_budget()
+    updated = make_budget(observations="Urgente", version=2)
+    entries = [
+        entry(1, {"action": "updated", "delta": diff_budget(created, updated)}),
+        entry(0, {"action": "created", "budget": created}),
+    ]
+
+    expanded = replay_budget_history(entries)
+
+    assert expanded["entry-1"]["previous"] == {"observations": "", "version": 1}
+
+
+def test_replay_applies_legacy_changes_entries():
+    created = make_budget()
+    legacy = {"action": "updated", "changes": {"observations": "Antigo", "version": 2}}
+    after_legacy = make_budget(observations="Antigo", version=2)
+    updated = make_budget(observations="Novo", version=3)
+    entries = [
+        entry(0, {"action": "created", "budget": created}),
+        entry(1, legacy),
+        entry(2, {"action": "updated", "delta": diff_budget(after_legacy, updated)}),
+    ]
+
+    expanded = replay_budget_history(entries)
+
+    assert expanded["entry-1"] == legacy
+    assert expanded["entry-2"]["previous"] == {"observations": "Antigo", "version": 2}
+    assert expanded["entry-2"]["changes"] == {"observations": "Novo", "version": 3}
+
+
+def test_replay_without_base_snapshot():
+    delta = {"fields": {"observations": "Novo"}}
+    entries = [entry(0, {"action": "updated", "delta": delta})]
+
+    expanded = replay_budget_history(entries)
+
+    assert expanded["entry-0"] == {"action": "updated", "delta": delta}
+
+
+def test_replay_legacy_duplicate_without_snapshot():
+    # Duplicates made before full snapshots only stored the original budget id
+    before = make_budget()
+    after = make_budget(items=[make_item("a"), make_item("b", quantity=3.0)], version=2)
+    legacy = {"action": "duplicated_from", "original_budget_id": "budget-0"}
+    updated = {"action": "updated", "delta": diff_budget(before, after)}
+    entries = [entry(0, legacy), entry(1, updated)]
+
+    expanded = replay_budget_history(entries)
+
+    assert expanded["entry-0"] == legacy
+    assert expanded["entry-1"] == updated
+
+
+def test_replay_keeps_deleted_entry_whole():
+    budget = make_budget()
+    deleted = {"action": "deleted", "budget": budget}
+
+    expanded = replay_budget_history([entry(0, deleted)])
+
+    assert expanded["entry-0"] == deleted
+
+
+# compact_history_entries
+
+def test_compact_rewrites_legacy_changes_as_deltas():
+    created = make_budget()
+    entries = [
+        entry(0, {"action": "created", "budget": created}),
+        entry(1, {"action": "updated", "changes": {"items": [make_item("a")], "total": 100.0, "version": 2}}),
+    ]
+
+    operations = compact_history_entries(entries)
+
+    assert len(operations) == 1
+    assert operations[0]._filter == {"id": "entry-1"}
+    assert operations[0]._doc == {"$set": {"changes": {
+        "action": "updated",
+        "delta": {
+            "fields": {"total": 100.0, "version": 2},
+            "items": {"length": 1, "changed": {}, "appended": []},
+        },
+    }}}
+
+
+def test_compact_then_replay_rebuilds_the_same_budget():
+    created = make_budget()
+    entries = [
+        entry(0, {"action": "created", "budget": created}),
+        entry(1, {"action": "updated", "changes": {"items": [make_item("a"), make_item("b"), make_item("c")], "version": 2}}),
+        entry(2, {"action": "updated", "changes": {"items": [make_item("c", quantity=2.0)], "version": 3}}),
+    ]
+
+    compacted = {operation._filter["id"]: operation._doc["$set"]["changes"] for operation in compact_history_entries(entries)}
+    state = created
+    for history_entry in entries[1:]:
+        state = apply_budget_delta(state, compacted[history_entry["id"]]["delta"])
+
+    assert state == make_budget(items=[make_item("c", quantity=2.0)], version=3)
+
+
+def test_compact_keeps_legacy_entries_without_base_snapshot():
+    entries = [
+        entry(0, {"action": "updated", "changes": {"observations": "Primeira", "version": 2}}),
+        entry(1, {"action": "updated", "changes": {"observations": "Segunda", "version": 3}}),
+    ]
+
+    # Without a base snapshot these entries are the only record of the budget
+    assert compact_history_entries(entries) == []
+
+
+def test_compact_legacy_duplicate_without_snapshot():
+    entries = [
+        entry(0, {"action": "duplicated_from", "original_budget_id": "budget-0"}),
+        entry(1, {"action": "updated", "changes": {"observations": "Primeira", "version": 2}}),
+    ]
+
+    assert compact_history_entries(entries) == []
+
+
+def test_compact_leaves_deleted_entries_alone():
+    budget = make_budget(version=2)
+    entries = [
+        entry(0, {"action": "created", "budget": make_budget()}),
+        entry(1, {"action": "updated", "delta": diff_budget(make_budget(), budget)}),
+        entry(2, {"action": "deleted", "budget": budget}),
+    ]
+
+    assert compact_history_entries(entries) == []
+
+
+def test_compact_skips_entries_already_stored_as_deltas():
+    created = make_budget()
+    updated = make_budget(observations="Novo", version=2)
+    entries = [
+        entry(0, {"action": "created", "budget": created}),
+        entry(1, {"action": "updated", "delta": diff_budget(created, updated)}),
+        entry(2, {"action": "updated", "changes": {"observations": "Outro", "version": 3}}),
+    ]
+
+    operations = compact_history_entries(entries)
+
+    assert len(operations) == 1
+    assert operations[0]._doc["$set"]["changes"]["delta"] == {"fields": {"observations": "Outro", "version": 3}}
@@ -0,0 +1,148 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from server import calculate_budget_totals, price_budget_items
+
+
+def make_item(**fields):
+    item = {
+        "item_id": "item-1",
+        "item_name": "Toldo",
+        "quantity": 1.0,
+        "unit_price": 100.0,
+        "length": None,
+        "height": None,
+        "width": None,
+        "area_m2": None,
+        "print_percentage": None,
+        "item_discount_percentage": 0.0,
+    }
+    item.update(fields)
+    return item
+
+
+def price_one(**fields):
+    return price_budget_items([make_item(**fields)])[0]
+
+
+# Area (BudgetCreator.calculateAreaM2 and the area_m2 input)
+
+def test_area_from_length_and_height():
+    item = price_one(length=5.0, height=3.0, quantity=2.0)
+
+    assert item["area_m2"] == 15.0
+    assert item["subtotal"] == 15.0 * 2.0 * 100.0
+
+
+def test_volume_when_width_is_set():
+    item = price_one(length=2.0, height=3.0, width=4.0)
+
+    assert item["area_m2"] == 24.0
+    assert item["subtotal"] == 2400.0
+
+
+def test_typed_area_wins_over_dimensions():
+    item = price_one(length=5.0, height=3.0, area_m2=10.0)
+
+    assert item["area_m2"] == 10.0
+    assert item["subtotal"] == 1000.0
+
+
+def test_area_needs_both_length_and_height():
+    item = price_one(length=5.0, height=0.0, quantity=3.0)
+
+    assert item["area_m2"] is None
+    assert item["subtotal"] == 300.0
+
+
+# Quantity-only pricing
+
+def test_quantity_pricing_without_area():
+    item = price_one(quantity=4.0, unit_price=25.0)
+
+    assert item["area_m2"] is None
+    assert item["subtotal"] == 100.0
+    assert item["final_price"] == 100.0
+
+
+# Print percentage, then item discount
+
+def test_print_percentage_applies_to_subtotal():
+    item = price_one(quantity=2.0, print_percentage=50.0)
+
+    assert item["subtotal"] == 200.0
+    assert item["final_price"] == 100.0
+
+
+def test_item_discount_applies_after_print_percentage():
+    item = price_one(quantity=2.0, print_percentage=50.0, item_discount_percentage=10.0)
+
+    assert item["subtotal"] == 200.0
+    assert item["final_price"] == pytest.approx(90.0)
+
+
+def test_item_discount_without_print_percentage():
+    item = price_one(length=2.0, height=5.0, item_discount_percentage=25.0)
+
+    assert item["subtotal"] == 1000.0
+    assert item["final_price"] == 750.0
+
+
+# Items without a price
+
+@pytest.mark.parametrize("unit_price", [0.0, -10.0, None])
+def test_item_without_price_is_worth_nothing(unit_price):
+    item = price_one(unit_price=unit_price, length=5.0, height=3.0, print_percentage=50.0)
+
+    assert item["subtotal"] == 0.0
+    assert item["final_price"] == 0.0
+
+
+def test_items_are_priced_independently():
+    items = price_budget_items([
+        make_item(quantity=2.0),
+        make_item(length=2.0, height=2.0, unit_price=50.0),
+        make_item(unit_price=0.0),
+    ])
+
+    assert [item["final_price"] for item in items] == [200.0, 200.0, 0.0]
+
+
+def test_no_items():
+    assert price_budget_items([]) == []
+
+
+# Budget discount (BudgetCreator.calculateTotals)
+
+def test_percentage_budget_discount():
+    totals = calculate_budget_totals([make_item(quantity=2.0), make_item(quantity=3.0)], 10.0, "percentage")
+
+    assert totals["subtotal"] == 500.0
+    assert totals["discount_amount"] == 50.0
+    assert totals["total"] == 450.0
+
+
+def test_fixed_budget_discount_is_sent_in_discount_percentage():
+    totals = calculate_budget_totals([make_item(quantity=2.0), make_item(quantity=3.0)], 120.0, "fixed")
+
+    assert totals["subtotal"] == 500.0
+    assert totals["discount_amount"] == 120.0
+    assert totals["total"] == 380.0
+
+
+def test_budget_subtotal_sums_final_prices():
+    totals = calculate_budget_totals(
+        [make_item(quantity=2.0, print_percentage=50.0), make_item(quantity=1.0, item_discount_percentage=20.0)],
+        0.0,
+        "percentage"
+    )
+
+    assert [item["final_price"] for item in totals["items"]] == [100.0, 80.0]
+    assert totals["subtotal"] == 180.0
+    assert totals["total"] == 180.0